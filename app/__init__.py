@@ -2,6 +2,14 @@ from flask import Flask, jsonify
 from .config import Config
 from .extensions import cors, supabase_client, attach_user_token
 from .routes import register_blueprints
+from .utils.assets import init_assets
+from .utils.compression import compress_response
+from .utils.log import init_logging
+from .utils.security import authenticate_request
+from .utils.sessions import create_session_interface
+from .utils.tracing import init_tracing
+from .services.products_svc import warm_search_index
+from .services.webhook_svc import start_webhook_worker
 import os
 
 def create_app():
@@ -11,6 +19,7 @@ def create_app():
                 template_folder=os.path.join(project_root, 'templates'),
                 static_folder=os.path.join(project_root, 'static'))
     app.config.from_object(Config)
+    init_logging(app)
     
     # Get the origins list from the config property
     config_obj = Config()
@@ -24,10 +33,26 @@ def create_app():
         SESSION_COOKIE_HTTPONLY=True,   # Prevent XSS
         SESSION_COOKIE_SECURE=False,    # Set to True in production with HTTPS
     )
+    if app.config["SESSION_STORE_URL"]:
+        # Cookie carries only an opaque session id; tokens stay on the server
+        app.session_interface = create_session_interface(
+            app.config["SESSION_STORE_URL"], app.config["SESSION_LIFETIME"], app.config["SESSION_TOUCH_INTERVAL"]
+        )
 
-    # Before each request, if we have a user token in session, attach it to PostgREST client
+    # Per-request trace of Supabase/Xendit calls (Server-Timing header, optional OTLP export).
+    # Registered first so its before_request also sees the token refresh, and its
+    # after_request runs last (after compression)
+    init_tracing(app)
+
+    # Verify the session's access token locally (refreshing it when close to expiry),
+    # then attach it to this request's PostgREST client
+    app.before_request(authenticate_request)
     app.before_request(attach_user_token)
 
+    # gzip/brotli for dynamic responses; hashed, precompressed static assets
+    app.after_request(compress_response)
+    init_assets(app)
+
     @app.context_processor
     def inject_config():
         # Memungkinkan template mengakses config["SUPABASE_URL"], dll.
@@ -39,4 +64,9 @@ def create_app():
         return jsonify({"success": True, "data": {"status": "ok"}}), 200
 
     register_blueprints(app)
+
+    # Build the optional in-process search index in the background
+    if app.config["SEARCH_INDEX_ENABLED"]:
+        warm_search_index(app)
+    start_webhook_worker(app)
     return app
@@ -10,6 +10,62 @@ class Config:
     FLASK_ENV = os.getenv("FLASK_ENV", "development")
     ALLOWED_ORIGINS = os.getenv("ALLOWED_ORIGINS", "http://localhost:5173,http://localhost:3000")
     PORT = int(os.getenv("PORT", "5000"))
+    CACHE_URL = os.getenv("CACHE_URL", "")  # e.g. redis://localhost:6379/0; empty = per-worker memory
+    CATALOG_CACHE_SIZE = int(os.getenv("CATALOG_CACHE_SIZE", "2048"))
+    CATALOG_CACHE_TTL = float(os.getenv("CATALOG_CACHE_TTL", "60"))
+    # Cache-Control per blueprint for catalog responses (see utils/http_cache.conditional).
+    # The ETag version counter is shared across workers only with CACHE_URL (Redis); with the
+    # in-memory cache each worker has its own, so an admin write revalidates on one worker only
+    # and the others catch up when the CATALOG_CACHE_TTL window rolls over
+    PRODUCTS_CACHE_CONTROL = os.getenv("PRODUCTS_CACHE_CONTROL", "public, max-age=30, stale-while-revalidate=300")
+    MAIN_CACHE_CONTROL = os.getenv("MAIN_CACHE_CONTROL", "public, max-age=0, must-revalidate")
+    # Rendered HTML cache for anonymous visitors (home, product detail); 0 entries = off
+    PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "256"))
+    PAGE_CACHE_TTL = float(os.getenv("PAGE_CACHE_TTL", "60"))
+    PAGE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("PAGE_CACHE_MAX_ENTRY_BYTES", str(256 * 1024)))
+    # Dynamic response compression (gzip, or brotli when installed)
+    COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))
+    COMPRESS_LEVEL = int(os.getenv("COMPRESS_LEVEL", "6"))
+    SEARCH_INDEX_ENABLED = os.getenv("SEARCH_INDEX_ENABLED", "false").lower() in ("1", "true", "yes")
+    LISTING_REFRESH_INTERVAL = float(os.getenv("LISTING_REFRESH_INTERVAL", "60"))  # used by scripts/refresh_listings.py
+    LISTING_STATUS_TTL = float(os.getenv("LISTING_STATUS_TTL", "10"))  # how long a worker reuses product_cards_status()
+    LISTING_MAX_STALENESS = float(os.getenv("LISTING_MAX_STALENESS", "300"))  # read products instead of product_cards beyond this lag
+    SEARCH_INDEX_REFRESH = float(os.getenv("SEARCH_INDEX_REFRESH", "300"))  # seconds between full rebuilds
+    # JWT verification caches (see utils/jwks.py)
+    JWKS_CACHE_TTL = float(os.getenv("JWKS_CACHE_TTL", "600"))
+    JWKS_MIN_REFETCH_INTERVAL = float(os.getenv("JWKS_MIN_REFETCH_INTERVAL", "30"))  # rate limit for unknown-kid refetches
+    SUPABASE_JWT_SECRET = os.getenv("SUPABASE_JWT_SECRET", "")  # verifies HS256 access tokens locally; empty = ask Supabase Auth once per token
+    JWT_REFRESH_MARGIN = float(os.getenv("JWT_REFRESH_MARGIN", "60"))  # refresh access tokens this many seconds before exp
+    JWT_CACHE_SIZE = int(os.getenv("JWT_CACHE_SIZE", "4096"))
+    # Server-side sessions: empty = Flask signed cookie; memory:// (dev), sqlite:///path or redis://...
+    SESSION_STORE_URL = os.getenv("SESSION_STORE_URL", "")
+    SESSION_LIFETIME = float(os.getenv("SESSION_LIFETIME", str(7 * 86400)))  # sliding expiry, seconds
+    SESSION_TOUCH_INTERVAL = float(os.getenv("SESSION_TOUCH_INTERVAL", "60"))  # batch expiry extensions
+    # Structured JSON logging (utils/log.py); LOG_LEVELS e.g. "app.routes.orders=DEBUG,app.services=WARNING"
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+    LOG_LEVELS = os.getenv("LOG_LEVELS", "")
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "0.1"))  # fraction of DEBUG records kept
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", "10000"))  # records beyond this are dropped, never block
+    # Request tracing (utils/tracing.py): Server-Timing header plus OTLP/JSON spans of every upstream call
+    SERVER_TIMING = os.getenv("SERVER_TIMING", "true").lower() in ("1", "true", "yes")
+    TRACE_EXPORT = os.getenv("TRACE_EXPORT", "")  # empty = off, file:///path/spans.jsonl or http://collector:4318/v1/traces
+    TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "1.0"))  # share of requests exported (an incoming traceparent decides for itself)
+    TRACE_SERVICE_NAME = os.getenv("TRACE_SERVICE_NAME", "shopeasy")
+    TRACE_REPEAT_WARN = int(os.getenv("TRACE_REPEAT_WARN", "5"))  # log when one request repeats the same upstream call this often; 0 = off
+    # Xendit webhook queue: empty = SQLite file in the instance folder, or sqlite:///path / redis://...
+    WEBHOOK_QUEUE_URL = os.getenv("WEBHOOK_QUEUE_URL", "")
+    WEBHOOK_WORKER_THREAD = os.getenv("WEBHOOK_WORKER_THREAD", "false").lower() in ("1", "true", "yes")
+    WEBHOOK_BATCH_SIZE = int(os.getenv("WEBHOOK_BATCH_SIZE", "200"))
+    WEBHOOK_POLL_INTERVAL = float(os.getenv("WEBHOOK_POLL_INTERVAL", "0.5"))
+    WEBHOOK_LEASE_SECONDS = float(os.getenv("WEBHOOK_LEASE_SECONDS", "60"))
+    WEBHOOK_MAX_ATTEMPTS = int(os.getenv("WEBHOOK_MAX_ATTEMPTS", "8"))
+    WEBHOOK_BACKOFF_BASE = float(os.getenv("WEBHOOK_BACKOFF_BASE", "2"))
+    WEBHOOK_BACKOFF_MAX = float(os.getenv("WEBHOOK_BACKOFF_MAX", "300"))
+    WEBHOOK_DEDUPE_TTL = float(os.getenv("WEBHOOK_DEDUPE_TTL", "86400"))  # seconds a (external_id, status) pair stays deduped
+    FANOUT_WORKERS = int(os.getenv("FANOUT_WORKERS", "16"))  # threads shared by utils.concurrency.parallel
+    # Run independent Supabase reads concurrently on an async I/O loop (off by default: slower than the thread fan-out, see bench_checkout.py)
+    ASYNC_IO = os.getenv("ASYNC_IO", "false").lower() in ("1", "true", "yes")
+    ASGI_THREADS = int(os.getenv("ASGI_THREADS", "32"))  # Flask requests handled at once per asgi.py worker
 
     @property
     def ALLOWED_ORIGINS_LIST(self):
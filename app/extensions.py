@@ -1,22 +1,190 @@
-from flask import session, current_app
+import asyncio
+import contextvars
+import os
+import threading
+import httpx
+from flask import session, current_app, g, has_request_context
 from flask_cors import CORS
-from supabase import create_client, Client
+from postgrest import AsyncPostgrestClient, SyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_TIMEOUT
+from supabase import create_client, Client, ClientOptions
+from .utils.tracing import TracingTransport, AsyncTracingTransport
 
 cors = CORS()
 _supabase: Client | None = None
+_rest_http: httpx.Client | None = None
+_service: Client | None = None
+_upstream_http: httpx.Client | None = None
+_init_lock = threading.Lock()
+_io_loop: asyncio.AbstractEventLoop | None = None
+_io_http: httpx.AsyncClient | None = None
+_io_pid: int | None = None
 
-def supabase_client() -> Client:
+def upstream_http() -> httpx.Client:
+    # Traced connection pool for Supabase auth/storage calls and the shared clients' own queries
+    global _upstream_http
+    if _upstream_http is None:
+        with _init_lock:
+            if _upstream_http is None:
+                _upstream_http = httpx.Client(
+                    transport=TracingTransport(httpx.HTTPTransport()),
+                    timeout=DEFAULT_POSTGREST_CLIENT_TIMEOUT,
+                    follow_redirects=True,
+                )
+    return _upstream_http
+
+def _base_client() -> Client:
+    # Shared anon client: used for auth calls and outside of a request context
     global _supabase
     if _supabase is None:
-        _supabase = create_client(current_app.config["SUPABASE_URL"], current_app.config["SUPABASE_ANON_KEY"])
+        http = upstream_http()
+        with _init_lock:
+            if _supabase is None:
+                _supabase = create_client(
+                    current_app.config["SUPABASE_URL"],
+                    current_app.config["SUPABASE_ANON_KEY"],
+                    ClientOptions(httpx_client=http),
+                )
     return _supabase
 
+def _rest_session(base: Client) -> httpx.Client:
+    # One HTTP connection pool (keep-alive sockets) shared by every request's PostgREST session
+    global _rest_http
+    if _rest_http is None:
+        with _init_lock:
+            if _rest_http is None:
+                _rest_http = httpx.Client(
+                    base_url=str(base.rest_url),
+                    transport=TracingTransport(httpx.HTTPTransport()),
+                    timeout=base.options.postgrest_client_timeout,
+                    follow_redirects=True,
+                )
+    return _rest_http
+
+class RequestClient:
+    """
+    Client Supabase milik satu request. Header Authorization disimpan di
+    PostgREST session request ini saja, sedangkan koneksi HTTP dipakai bersama,
+    sehingga aman dipakai oleh banyak thread per worker.
+    """
+
+    def __init__(self, base: Client, token: str | None = None):
+        self._base = base
+        headers = {**base.options.headers, "Authorization": f"Bearer {token or base.supabase_key}"}
+        self.postgrest = SyncPostgrestClient(
+            str(base.rest_url),
+            headers=headers,
+            schema=base.options.schema,
+            http_client=_rest_session(base),
+        )
+
+    @property
+    def auth(self):
+        return self._base.auth
+
+    def table(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def from_(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: dict | None = None, **kwargs):
+        return self.postgrest.rpc(fn, params or {}, **kwargs)
+
+def _io_runtime(base: Client) -> tuple:
+    # One event loop thread + async connection pool per process (threads do not survive fork)
+    global _io_loop, _io_http, _io_pid
+    if _io_pid != os.getpid():
+        with _init_lock:
+            if _io_pid != os.getpid():
+                loop = asyncio.new_event_loop()
+                threading.Thread(target=loop.run_forever, name="supabase-io", daemon=True).start()
+                _io_http = httpx.AsyncClient(
+                    base_url=str(base.rest_url),
+                    transport=AsyncTracingTransport(httpx.AsyncHTTPTransport()),
+                    timeout=base.options.postgrest_client_timeout,
+                    follow_redirects=True,
+                )
+                _io_loop, _io_pid = loop, os.getpid()
+    return _io_loop, _io_http
+
+class AsyncRequestClient:
+    """
+    Pasangan async dari RequestClient: query PostgREST yang di-`await` di
+    event loop I/O bersama, sehingga beberapa query independen bisa berjalan
+    bersamaan lewat asyncio.gather. Jalankan coroutine-nya dengan run_async().
+    """
+
+    def __init__(self, base: Client, token: str | None = None):
+        headers = {**base.options.headers, "Authorization": f"Bearer {token or base.supabase_key}"}
+        self.postgrest = AsyncPostgrestClient(
+            str(base.rest_url),
+            headers=headers,
+            schema=base.options.schema,
+            http_client=_io_runtime(base)[1],
+        )
+
+    def table(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def from_(self, table_name: str):
+        return self.postgrest.from_(table_name)
+
+    def rpc(self, fn: str, params: dict | None = None, **kwargs):
+        return self.postgrest.rpc(fn, params or {}, **kwargs)
+
+def async_supabase_client() -> AsyncRequestClient:
+    # Build inside the request (it reads the session token), await on the I/O loop
+    if not has_request_context():
+        return AsyncRequestClient(_base_client())
+    client = g.get("_async_supabase_client")
+    if client is None:
+        client = g._async_supabase_client = AsyncRequestClient(_base_client(), session.get("access_token"))
+    return client
+
+async def _in_context(coro, ctx: contextvars.Context):
+    # Tasks on the I/O loop start from the loop thread's context; carry over the caller's
+    # (Flask app/request context, so `g` and the request trace work inside the coroutine)
+    for var, value in ctx.items():
+        var.set(value)
+    return await coro
+
+def run_async(coro, timeout: float | None = None):
+    # Block the calling worker thread until `coro` finishes on the shared I/O loop
+    loop, _ = _io_runtime(_base_client())
+    return asyncio.run_coroutine_threadsafe(_in_context(coro, contextvars.copy_context()), loop).result(timeout)
+
+def supabase_client() -> Client | RequestClient:
+    if not has_request_context():
+        return _base_client()
+    client = g.get("_supabase_client")
+    if client is None:
+        client = g._supabase_client = RequestClient(_base_client(), session.get("access_token"))
+    return client
+
+def service_client() -> Client | None:
+    # Shared service-role client for trusted background work (bypasses RLS); None if no key is set
+    global _service
+    key = current_app.config.get("SUPABASE_SERVICE_ROLE_KEY")
+    if not key:
+        return None
+    if _service is None:
+        http = upstream_http()
+        with _init_lock:
+            if _service is None:
+                _service = create_client(current_app.config["SUPABASE_URL"], key, ClientOptions(httpx_client=http))
+    return _service
+
+def anon_client() -> RequestClient:
+    # Fresh anon PostgREST session, e.g. for background jobs that run outside a request
+    return RequestClient(_base_client())
+
 def attach_user_token():
-    # If user is logged in, attach their access token to Postgrest so RLS uses auth.uid()
+    # If user is logged in, give this request its own PostgREST session so RLS uses auth.uid()
     token = session.get("access_token")
     if token:
         try:
-            supabase_client().postgrest.auth(token)
+            g._supabase_client = RequestClient(_base_client(), token)
         except:
             # If setting auth fails, continue without error
             pass
@@ -34,16 +34,15 @@ def update_address(address_id):
     body = request.get_json() or {}
     sb = supabase_client()
     
-    # Check if address belongs to user
-    addr = sb.table("addresses").select("*").eq("id", address_id).eq("user_id", uid).execute().data
-    if not addr:
+    # Update only the user's own row; no row returned means the address is not theirs
+    res = sb.table("addresses").update(body).eq("id", address_id).eq("user_id", uid).execute()
+    if not res.data:
         return jsonify({"success": False, "error": "Address not found"}), 404
     
     # If this is being set as default, unset other default addresses for this user
     if body.get("is_default", False):
-        sb.table("addresses").update({"is_default": False}).eq("user_id", uid).eq("is_default", True).execute()
+        sb.table("addresses").update({"is_default": False}).eq("user_id", uid).eq("is_default", True).neq("id", address_id).execute()
     
-    res = sb.table("addresses").update(body).eq("id", address_id).execute()
     return jsonify({"success": True, "data": res.data})
 
 @bp.delete("/<address_id>")
@@ -52,12 +51,11 @@ def delete_address(address_id):
     uid = session["user_id"]
     sb = supabase_client()
     
-    # Check if address belongs to user
-    addr = sb.table("addresses").select("*").eq("id", address_id).eq("user_id", uid).execute().data
-    if not addr:
+    # Delete only the user's own row; no row returned means the address is not theirs
+    res = sb.table("addresses").delete().eq("id", address_id).eq("user_id", uid).execute()
+    if not res.data:
         return jsonify({"success": False, "error": "Address not found"}), 404
     
-    res = sb.table("addresses").delete().eq("id", address_id).execute()
     return jsonify({"success": True, "data": res.data})
 
 @bp.get("/default")
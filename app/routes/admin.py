@@ -1,6 +1,11 @@
 from flask import Blueprint, request, jsonify
-from ..utils.security import require_admin
+from ..utils.security import require_admin, jwt_cache_stats
 from ..services.orders_svc import admin_update_status
+from ..services.products_svc import catalog_cache_stats, search_index_stats, listing_status
+from ..services.webhook_svc import webhook_queue_stats
+from ..utils.page_cache import page_cache_stats
+from ..utils.log import log_stats
+from ..utils.tracing import trace_stats
 
 bp = Blueprint("admin", __name__)
 
@@ -13,3 +18,13 @@ def update_status(order_id):
         return jsonify({"success": False, "data": None, "error": {"code": "VALIDATION_ERROR", "message": "status must be 'paid' or 'delivered'"}}), 422
     data = admin_update_status(order_id, status)
     return jsonify({"success": True, "data": data, "error": None}), 200
+
+@bp.get("/cache/stats")
+@require_admin
+def cache_stats():
+    return jsonify({"success": True, "data": {"catalog": catalog_cache_stats(), "search_index": search_index_stats(), "listing": listing_status(), "pages": page_cache_stats(), "jwt": jwt_cache_stats(), "logging": log_stats(), "tracing": trace_stats()}, "error": None}), 200
+
+@bp.get("/webhooks/stats")
+@require_admin
+def webhook_stats():
+    return jsonify({"success": True, "data": webhook_queue_stats(), "error": None}), 200
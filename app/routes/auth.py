@@ -37,6 +37,7 @@ def do_login():
 
         # store in session
         session["access_token"] = resp.session.access_token
+        session["refresh_token"] = resp.session.refresh_token
         session["user_id"] = resp.user.id
         session["user_email"] = resp.user.email  # Simpan email ke session
         # Try to read role from app_metadata
@@ -88,6 +89,8 @@ def adopt_session():
                         "error": {"code": "INVALID_TOKEN", "message": f"Invalid or expired Supabase token: {str(e)}"}}), 401
 
     session["access_token"] = token
+    if body.get("refresh_token"):
+        session["refresh_token"] = body["refresh_token"]
     session["user_id"] = payload.get("sub")                # UUID user Supabase
     session["user_email"] = payload.get("email") or session.get("user_email")  # Gunakan email dari payload atau tetap simpan yang lama
     session["role"] = payload.get("role") or "authenticated"
@@ -1,11 +1,18 @@
+import logging
 from flask import Blueprint, render_template, request, jsonify
-from ..services.products_svc import list_products, get_product
+from ..services.products_svc import list_products, get_product, catalog_version
 from ..utils.validators import parse_int, parse_float
+from ..utils.http_cache import conditional
+from ..utils.page_cache import cached_page, skip_page_cache
+
+log = logging.getLogger(__name__)
 
 bp = Blueprint("main", __name__)
 
 @bp.route("/")
 @bp.route("/home")
+@conditional(catalog_version)
+@cached_page(catalog_version, params=("brand", "category", "min_price", "max_price", "min_rating", "sort", "page", "limit"))
 def home():
     brand = request.args.get("brand")
     category = request.args.get("category")
@@ -22,9 +29,9 @@ def home():
             {"brand": brand, "category": category, "min_price": min_price, "max_price": max_price, "min_rating": min_rating},
             page, limit, sort
         )
-    except Exception as e:
+    except Exception:
         # Log the error but continue with empty data
-        print(f"Error fetching products: {e}")
+        log.exception("Fetching products for home page failed")
         products_data = {"items": [], "page": 1, "has_more": False, "page_size": 20}
     
     return render_template("home.html", products=products_data)
@@ -34,14 +41,15 @@ def products():
     return render_template("products.html")
 
 @bp.route("/products/<prod_id>")
+@conditional(catalog_version)
+@cached_page(catalog_version)
 def product_detail(prod_id):
     # Get the product data to pass to the template
-    print(f"Fetching product with ID: {prod_id}")  # Debug log
     product_data = get_product(prod_id)
-    print(f"Product data: {product_data}")  # Debug log
     if not product_data:
         # If product not found, we can still render the template and let JS handle the error
-        print(f"Product with ID {prod_id} not found")  # Debug log
+        log.debug("Product not found", extra={"product_id": prod_id})
+        skip_page_cache()
         return render_template("detail.html", product_id=prod_id)
     return render_template("detail.html", product_id=prod_id, product=product_data)
 
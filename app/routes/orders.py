@@ -1,59 +1,59 @@
-from flask import Blueprint, jsonify, session, request, redirect, url_for
-from ..extensions import supabase_client
+import logging
+from flask import Blueprint, current_app, jsonify, session, request, redirect, url_for
+from ..extensions import supabase_client, run_async
 from ..utils.security import require_auth
-from ..services.orders_svc import list_orders, get_order, compute_cart_total, create_order_and_clear_cart, compute_selected_cart_total, create_order_and_clear_selected_cart, update_order_status
+from ..utils.tracing import upstream_span
+from ..utils.validators import parse_int
+from ..services.webhook_svc import enqueue_webhook
+from ..services.orders_svc import list_orders, encode_order_cursor, get_order, checkout as checkout_order, checkout_with_address, checkout_async, CHECKOUT_RPC_MISSING
 import os
 import requests
 from urllib.parse import urljoin
 
+log = logging.getLogger(__name__)
+
 bp = Blueprint("orders", __name__)
 
+_CHECKOUT_ERRORS = {
+    "ADDRESS_REQUIRED": "Shipping address required",
+    "INVALID_ADDRESS": "Invalid shipping address",
+}
+
+def _checkout_message(code: str, selected_product_ids) -> str:
+    if code == "EMPTY_CART":
+        return "No selected items in cart" if selected_product_ids else "No items in cart"
+    return _CHECKOUT_ERRORS[code]
+
 @bp.post("/checkout")
 @require_auth
 def checkout():
     uid = session["user_id"]
-    print(f"Checkout request for user: {uid}")  # Debug log
     body = request.get_json() or {}
     selected_product_ids = body.get("product_ids")  # Optional: array of product IDs to checkout
     address_id = body.get("address_id")  # Required: address ID for shipping
     
-    print(f"Selected product IDs: {selected_product_ids}")  # Debug log
-    print(f"Address ID: {address_id}")  # Debug log
-    
-    # Validate address
-    if not address_id:
-        # Try to get default address if no address_id provided
-        sb = supabase_client()
-        addr = sb.table("addresses").select("id").eq("user_id", uid).eq("is_default", True).limit(1).execute().data
-        if addr:
-            address_id = addr[0]["id"]
-        else:
-            return jsonify({"success": False, "data": None, "error": {"code": "ADDRESS_REQUIRED", "message": "Shipping address required"}}, 400)
-    
-    # Validate address belongs to user
-    sb = supabase_client()
-    addr = sb.table("addresses").select("*").eq("id", address_id).eq("user_id", uid).execute().data
-    if not addr:
-        return jsonify({"success": False, "data": None, "error": {"code": "INVALID_ADDRESS", "message": "Invalid shipping address"}}, 400)
-
-    if selected_product_ids and isinstance(selected_product_ids, list) and len(selected_product_ids) > 0:
-        # Checkout only selected products
-        print(f"Checking out selected products: {selected_product_ids}")  # Debug log
-        total, items = compute_selected_cart_total(uid, selected_product_ids)
-        if not items:
-            return jsonify({"success": False, "data": None, "error": {"code": "EMPTY_CART", "message": "No selected items in cart"}}, 400)
-        
-        order = create_order_and_clear_selected_cart(uid, total, selected_product_ids, address_id)
-        print(f"Created order for selected items: {order}")  # Debug log
-    else:
+    log.debug("Checkout request", extra={"user_id": uid, "product_ids": selected_product_ids, "address_id": address_id})
+
+    if not (selected_product_ids and isinstance(selected_product_ids, list)):
         # Checkout all products
-        print("Checking out all products")  # Debug log
-        total, items = compute_cart_total(uid)
-        if not items:
-            return jsonify({"success": False, "data": None, "error": {"code": "EMPTY_CART", "message": "No items in cart"}}, 400)
-        
-        order = create_order_and_clear_cart(uid, total, address_id)
-        print(f"Created order for all items: {order}")  # Debug log
+        selected_product_ids = None
+
+    if current_app.config.get("ASYNC_IO"):
+        # Address check and checkout_cart run concurrently on the async I/O loop
+        error, address_id, order = run_async(checkout_async(uid, address_id, selected_product_ids))
+        if order is CHECKOUT_RPC_MISSING:
+            # Address is already validated; run the legacy multi-call checkout
+            order = checkout_order(uid, address_id, selected_product_ids)
+    else:
+        # Address check and checkout_cart run in parallel on the request fan-out pool
+        error, address_id, order = checkout_with_address(uid, address_id, selected_product_ids)
+    if error:
+        return jsonify({"success": False, "data": None, "error": {"code": error, "message": _checkout_message(error, selected_product_ids)}}), 400
+
+    log.debug("Checkout result", extra={"user_id": uid, "order_id": order["order_id"] if order else None})
+    if not order:
+        return jsonify({"success": False, "data": None, "error": {"code": "EMPTY_CART", "message": _checkout_message("EMPTY_CART", selected_product_ids)}}), 400
+    total = float(order["total_price"])
     
     return jsonify({"success": True, "data": {"order": order, "total": total}, "error": None}), 201
 
@@ -61,10 +61,15 @@ def checkout():
 @require_auth
 def my_orders():
     uid = session["user_id"]
-    print(f"Fetching orders for user: {uid}")  # Debug log
-    data = list_orders(uid)
-    print(f"Found {len(data) if data else 0} orders")  # Debug log
-    return jsonify({"success": True, "data": data, "error": None}), 200
+    page = parse_int(request.args.get("page"), 1, 1)
+    limit = parse_int(request.args.get("limit"), 20, 1, 100)
+    cursor = request.args.get("cursor")
+    try:
+        data = list_orders(uid, page, limit, cursor)
+    except ValueError as e:
+        return jsonify({"success": False, "data": None, "error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 422
+    next_cursor = encode_order_cursor(data[-1]) if len(data) == limit else None
+    return jsonify({"success": True, "data": data, "next_cursor": next_cursor, "error": None}), 200
 
 @bp.get("/orders/<order_id>")
 @require_auth
@@ -99,8 +104,7 @@ def pay_order(order_id):
         if not xendit_secret_key:
             return jsonify({"success": False, "data": None, "error": {"code": "CONFIG_ERROR", "message": "Xendit configuration not found"}}, 500)
         
-        # Log order info for debugging
-        print(f"🔍 Preparing Xendit invoice for order: {order_id}, amount: {order['total_price']}")
+        log.info("Creating Xendit invoice", extra={"order_id": order_id, "amount": float(order["total_price"])})
         
         # Buat payload untuk invoice Xendit
         payload = {
@@ -113,14 +117,17 @@ def pay_order(order_id):
         }
 
         # Buat invoice di Xendit
-        resp = requests.post(
-            "https://api.xendit.co/v2/invoices",
-            json=payload,
-            auth=(xendit_secret_key, "")
-        )
+        xendit_url = "https://api.xendit.co/v2/invoices"
+        with upstream_span("xendit", "POST", xendit_url) as span:
+            resp = requests.post(
+                xendit_url,
+                json=payload,
+                auth=(xendit_secret_key, "")
+            )
+            span.set_response(resp.status_code, len(resp.request.body or b""), len(resp.content))
         
         if resp.status_code != 200:
-            print(f"Error creating Xendit invoice: {resp.text}")
+            log.error("Creating Xendit invoice failed", extra={"order_id": order_id, "status_code": resp.status_code, "body": resp.text[:500]})
             return jsonify({"success": False, "data": None, "error": {"code": "XENDIT_ERROR", "message": resp.text}}, 500)
         
         invoice = resp.json()
@@ -128,19 +135,14 @@ def pay_order(order_id):
         # Redirect user ke halaman pembayaran Xendit
         return redirect(invoice["invoice_url"])
     except Exception as e:
-        print(f"Error in pay_order: {str(e)}")
+        log.exception("pay_order failed", extra={"order_id": order_id})
         return jsonify({"success": False, "data": None, "error": {"code": "PAYMENT_ERROR", "message": str(e)}}, 500)
 
 # Webhook untuk menerima callback dari Xendit
 @bp.route("/webhook", methods=["POST"])
 def webhook():
     try:
-        # Tambahkan logging untuk debugging
-        print(f"Webhook received at {request.url}")
-        print(f"Request headers: {dict(request.headers)}")
-        
         data = request.get_json()
-        print(f"Request data: {data}")
         
         # Verifikasi webhook token jika disediakan
         x_callback_token = request.headers.get("x-callback-token")
@@ -149,30 +151,14 @@ def webhook():
         # Jika webhook token diatur di environment, lakukan verifikasi
         if webhook_token:
             if not x_callback_token or x_callback_token != webhook_token:
-                print(f"Webhook token mismatch. Expected: {webhook_token}, Received: {x_callback_token}")
+                log.warning("Webhook token mismatch", extra={"remote_addr": request.remote_addr})
                 return jsonify({"message": "Unauthorized"}), 401
 
-        status = data.get("status")
-        order_id = data.get("external_id")
-
-        if status == "PAID":
-            # Update status order menjadi 'paid'
-            update_order_status(order_id, "paid")
-            print(f"✅ Pembayaran untuk order {order_id} berhasil!")
-            
-        elif status == "EXPIRED":
-            # Update status order menjadi 'expired' atau tetap 'pending'
-            update_order_status(order_id, "pending")
-            print(f"⚠️ Pembayaran untuk order {order_id} kadaluarsa.")
-            
-        elif status == "FAILED":
-            # Update status order menjadi 'failed' atau tetap 'pending'
-            update_order_status(order_id, "pending")
-            print(f"❌ Pembayaran untuk order {order_id} gagal.")
+        # Queue the event and answer right away; the webhook worker applies the status update
+        queued = enqueue_webhook(data or {})
+        log.info("Webhook received", extra={"external_id": (data or {}).get("external_id"), "status": (data or {}).get("status"), "queued": queued})
 
         return jsonify({"message": "Webhook received"}), 200
-    except Exception as e:
-        print(f"Error processing webhook: {e}")
-        import traceback
-        traceback.print_exc()  # Tambahkan traceback untuk debugging
+    except Exception:
+        log.exception("Processing webhook failed")
         return jsonify({"message": "Error processing webhook"}), 500
@@ -1,11 +1,16 @@
+import logging
 from flask import Blueprint, request, jsonify
-from ..services.products_svc import list_products, get_product, admin_upsert_product, admin_delete_product
+from ..services.products_svc import list_products, get_product, admin_upsert_product, admin_delete_product, next_cursor, product_facets, resolve_fields, catalog_version
 from ..utils.validators import parse_int, parse_float
+from ..utils.http_cache import conditional
 from ..utils.security import require_admin
 
+log = logging.getLogger(__name__)
+
 bp = Blueprint("products", __name__)
 
 @bp.get("")
+@conditional(catalog_version)
 def list_():
     brand = request.args.get("brand")
     category = request.args.get("category")
@@ -15,15 +20,42 @@ def list_():
     sort = request.args.get("sort", "created_desc")
     page = parse_int(request.args.get("page"), 1, 1)
     limit = parse_int(request.args.get("limit"), 20, 1, 100)
+    cursor = request.args.get("cursor")  # Present (even empty) = keyset pagination
     # For regular listing, no search query is passed
 
-    data = list_products(
-        {"brand": brand, "category": category, "min_price": min_price, "max_price": max_price, "min_rating": min_rating},
-        page, limit, sort
-    )
-    return jsonify({"success": True, "data": data, "error": None}), 200
+    try:
+        fields = resolve_fields(request.args.get("view"), request.args.get("fields"))
+        data = list_products(
+            {"brand": brand, "category": category, "min_price": min_price, "max_price": max_price, "min_rating": min_rating},
+            page, limit, sort, cursor=cursor or None, fields=fields
+        )
+    except ValueError as e:
+        return jsonify({"success": False, "data": None, "error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 422
+    body = {"success": True, "data": data, "error": None}
+    if cursor is not None:
+        body["next_cursor"] = next_cursor(data, sort, limit)
+    return jsonify(body), 200
+
+@bp.get("/facets")
+@conditional(catalog_version)
+def facets():
+    search_query = request.args.get("q") or None
+    brand = request.args.get("brand")
+    category = request.args.get("category")
+    min_price = parse_float(request.args.get("min_price"))
+    max_price = parse_float(request.args.get("max_price"))
+    min_rating = parse_float(request.args.get("min_rating"))
+
+    filters = {"brand": brand, "category": category, "min_price": min_price, "max_price": max_price, "min_rating": min_rating}
+    try:
+        data = product_facets(filters, search_query)
+        return jsonify({"success": True, "data": data, "error": None}), 200
+    except Exception as e:
+        log.exception("Product facets failed")
+        return jsonify({"success": False, "data": None, "error": {"code": "FACETS_ERROR", "message": str(e)}}), 500
 
 @bp.get("/<prod_id>")
+@conditional(catalog_version)
 def detail(prod_id):
     data = get_product(prod_id)
     if not data:
@@ -31,6 +63,7 @@ def detail(prod_id):
     return jsonify({"success": True, "data": data, "error": None}), 200
 
 @bp.get("/search")
+@conditional(catalog_version)
 def search_products():
     search_query = request.args.get("q", "")
     brand = request.args.get("brand")
@@ -38,9 +71,11 @@ def search_products():
     min_price = parse_float(request.args.get("min_price"))
     max_price = parse_float(request.args.get("max_price"))
     min_rating = parse_float(request.args.get("min_rating"))
-    sort = request.args.get("sort", "created_desc")
     page = parse_int(request.args.get("page"), 1, 1)
     limit = parse_int(request.args.get("limit"), 20, 1, 100)
+    cursor = request.args.get("cursor")  # Present (even empty) = keyset pagination
+    # Rank by relevance by default; relevance has no keyset cursor, so cursor paging keeps created_desc
+    sort = request.args.get("sort") or ("created_desc" if cursor is not None else "relevance")
 
     if not search_query:
         return jsonify({"success": False, "data": [], "error": {"code": "VALIDATION_ERROR", "message": "Query parameter 'q' is required for search"}}, 400)
@@ -49,14 +84,22 @@ def search_products():
     filters = {"brand": brand, "category": category, "min_price": min_price, "max_price": max_price, "min_rating": min_rating}
 
     try:
+        fields = resolve_fields(request.args.get("view"), request.args.get("fields"))
         data = list_products(
             filters,
             page, limit, sort,
-            search_query=search_query  # Pass search query to the service function
+            search_query=search_query,  # Pass search query to the service function
+            cursor=cursor or None,
+            fields=fields
         )
-        return jsonify({"success": True, "data": data, "error": None}), 200
+        body = {"success": True, "data": data, "error": None}
+        if cursor is not None:
+            body["next_cursor"] = next_cursor(data, sort, limit)
+        return jsonify(body), 200
+    except ValueError as e:
+        return jsonify({"success": False, "data": [], "error": {"code": "VALIDATION_ERROR", "message": str(e)}}), 422
     except Exception as e:
-        print(f"Search products error: {str(e)}")  # Debug log
+        log.exception("Search products failed")
         return jsonify({"success": False, "data": [], "error": {"code": "SEARCH_ERROR", "message": str(e)}}), 500
 
 @bp.post("")
@@ -1,4 +1,17 @@
-from ..extensions import supabase_client
+import httpx
+from flask import current_app
+from ..extensions import supabase_client, upstream_http
+
+class AuthServerUnavailable(RuntimeError):
+    # Supabase Auth could not be reached or failed (5xx/429): no verdict on the token
+    pass
+
+def _auth_outcome(resp: httpx.Response, what: str):
+    if resp.status_code == 200:
+        return resp.json()
+    if resp.status_code >= 500 or resp.status_code == 429:
+        raise AuthServerUnavailable(f"{what}: Supabase Auth answered {resp.status_code}")
+    return None
 
 def signup(email, password):
     sb = supabase_client()
@@ -19,3 +32,40 @@ def reset_password(email, redirect_to=None):
     sb = supabase_client()
     options = {"email_redirect_to": redirect_to} if redirect_to else {}
     return sb.auth.reset_password_for_email(email, options)
+
+def refresh_access_token(refresh_token):
+    """
+    Tukar refresh token dengan access token baru langsung ke endpoint GoTrue.
+    Tidak memakai sb.auth.refresh_session() karena client auth dipakai bersama
+    dan akan menyimpan session user ini di dalamnya. Return dict session, None
+    jika refresh token ditolak, atau raise AuthServerUnavailable.
+    """
+    url = f"{current_app.config['SUPABASE_URL'].rstrip('/')}/auth/v1/token"
+    try:
+        resp = upstream_http().post(
+            url,
+            params={"grant_type": "refresh_token"},
+            json={"refresh_token": refresh_token},
+            headers={"apikey": current_app.config["SUPABASE_ANON_KEY"]},
+            timeout=10,
+        )
+    except httpx.HTTPError as e:
+        raise AuthServerUnavailable(f"Access token refresh failed: {e}") from e
+    return _auth_outcome(resp, "Access token refresh")
+
+def fetch_auth_user(access_token):
+    """
+    Validasi access token ke GoTrue (GET /auth/v1/user). Return dict user jika
+    token diterima, None jika ditolak; raise AuthServerUnavailable jika server
+    auth tidak bisa dihubungi atau error.
+    """
+    url = f"{current_app.config['SUPABASE_URL'].rstrip('/')}/auth/v1/user"
+    try:
+        resp = upstream_http().get(
+            url,
+            headers={"apikey": current_app.config["SUPABASE_ANON_KEY"], "Authorization": f"Bearer {access_token}"},
+            timeout=10,
+        )
+    except httpx.HTTPError as e:
+        raise AuthServerUnavailable(f"Verifying access token with Supabase Auth failed: {e}") from e
+    return _auth_outcome(resp, "Verifying access token")
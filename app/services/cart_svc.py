@@ -1,4 +1,5 @@
 from ..extensions import supabase_client
+from .products_svc import PROJECTIONS, select_columns
 
 def get_cart(user_id: str):
     sb = supabase_client()
@@ -8,7 +9,7 @@ def get_cart(user_id: str):
         return []
 
     product_ids = [c["product_id"] for c in cart_items]
-    products = sb.table("products").select("id,name,price,brand,images").in_("id", product_ids).execute().data
+    products = sb.table("products").select(select_columns(PROJECTIONS["cart_line"])).in_("id", product_ids).execute().data
 
     product_map = {p["id"]: p for p in products}
 
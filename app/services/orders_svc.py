@@ -1,129 +1,171 @@
-from ..extensions import supabase_client
-from supabase import create_client
-import os
+import logging
+from ..extensions import supabase_client, async_supabase_client, service_client
+from ..utils.concurrency import parallel
+from postgrest.exceptions import APIError
+from postgrest.types import ReturnMethod
+from datetime import datetime
+import asyncio
+import base64
+import httpx
+import json
+import time
+import uuid
 
-def list_orders(user_id: str):
-    sb = supabase_client()
-    
-    # Get all orders for the user
-    orders = sb.table("orders").select("*").eq("user_id", user_id).order("created_at", desc=True).execute().data
-    
-    # Get items for each order
+log = logging.getLogger(__name__)
+
+ORDER_ITEMS_SELECT = "*, product_id(name, brand, images, category)"
+
+def _attach_order_items(sb, orders: list):
+    # Load items for all orders in one query, then stitch them back in memory
+    if not orders:
+        return orders
+    order_ids = [o["order_id"] for o in orders]
+    rows = sb.table("order_items").select(ORDER_ITEMS_SELECT).in_("order_id", order_ids).execute().data
+    items_by_order = {oid: [] for oid in order_ids}
+    for row in rows:
+        items_by_order.setdefault(row["order_id"], []).append(row)
     for order in orders:
-        order_items = (
-            sb.table("order_items")
-            .select("*, product_id(name, brand, images, category)")
-            .eq("order_id", order["order_id"])
-            .execute()
-            .data
-        )
-        order["items"] = order_items
-    
+        order["items"] = items_by_order.get(order["order_id"], [])
     return orders
 
+def list_orders(user_id: str, page: int = 1, limit: int = 20, cursor: str = None):
+    """
+    Ambil satu halaman order milik user beserta item-nya (2 query per halaman).
+    Urutan created_at desc lalu order_id desc. Jika `cursor` (lihat
+    encode_order_cursor) diberikan, pakai keyset pagination dan abaikan `page`.
+    Raise ValueError untuk cursor yang tidak valid.
+    """
+    sb = supabase_client()
+
+    query = sb.table("orders").select("*").eq("user_id", user_id)
+    if cursor:
+        created_at, order_id = decode_order_cursor(cursor)
+        # Orders created in the same instant are split by order_id, so none is skipped or repeated
+        query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",order_id.lt.{order_id})')
+        start = 0
+    else:
+        start = (page - 1) * limit
+    orders = (
+        query.order("created_at", desc=True).order("order_id", desc=True)
+        .range(start, start + limit - 1).execute().data
+    )
+
+    return _attach_order_items(sb, orders)
+
+def encode_order_cursor(order: dict) -> str:
+    # Opaque to clients: (created_at, order_id) of the last order on the page
+    raw = json.dumps({"c": order["created_at"], "id": order["order_id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_order_cursor(cursor: str) -> tuple:
+    # Both values end up inside a PostgREST filter, so only a real timestamp and uuid pass
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(data["c"]).isoformat()
+        order_id = str(uuid.UUID(data["id"]))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return created_at, order_id
+
 def get_order(user_id: str, order_id: str):
     sb = supabase_client()
-    
-    # Get the specific order
-    order = sb.table("orders").select("*").eq("order_id", order_id).eq("user_id", user_id).single().execute().data
-    
+
+    # The order and its items are independent reads; items are dropped if the order is not the user's
+    order, items = parallel(
+        lambda: sb.table("orders").select("*").eq("order_id", order_id).eq("user_id", user_id).single().execute().data,
+        lambda: sb.table("order_items").select(ORDER_ITEMS_SELECT).eq("order_id", order_id).execute().data,
+    )
     if order:
-        # Get items for this order
-        order_items = (
-            sb.table("order_items")
-            .select("*, product_id(name, brand, images, category)")
-            .eq("order_id", order_id)
-            .execute()
-            .data
-        )
-        order["items"] = order_items
-    
+        order["items"] = items
     return order
 
 def admin_update_status(order_id: str, status: str):
     return supabase_client().table("orders").update({"status": status}).eq("order_id", order_id).execute().data
 
 def update_order_status(order_id: str, status: str):
-    """Update order status - used for webhook updates"""
-    try:
-        # Untuk webhook, kita perlu menggunakan service role key agar bisa mengupdate
-        # meskipun RLS membatasi update untuk non-admin
-        service_role_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY")
-        if not service_role_key:
-            print("❌ Service role key not found, cannot update order status from webhook")
-            return None
-            
-        # Buat client dengan service role key
-        service_client = create_client(os.getenv("SUPABASE_URL"), service_role_key)
-        
-        # Cek dulu apakah order ada sebelum mencoba update
-        existing_order = service_client.table("orders").select("*").eq("order_id", order_id).execute().data
-        print(f"🔍 Order {order_id} found in DB before update (using service role): {len(existing_order) if existing_order else 0} records")
-        
-        if existing_order:
-            print(f"🔍 Order {order_id} current status: {existing_order[0].get('status', 'unknown')}")
-        
-        # Lakukan update menggunakan service client
-        result = service_client.table("orders").update({"status": status}).eq("order_id", order_id).execute()
-        rows_affected = len(result.data) if result.data else 0
-        
-        print(f"✅ Order {order_id} status update attempt to '{status}' (using service role). Rows affected: {rows_affected}")
-        
-        if rows_affected == 0:
-            # Jika update gagal, coba cari apakah ada perbedaan case atau masalah karakter
-            print(f"❌ Update failed for order {order_id}. Checking for similar IDs...")
-            
-            # Ambil beberapa order terbaru untuk perbandingan
-            recent_orders = service_client.table("orders").select("order_id").order("created_at", desc=True).limit(5).execute().data
-            print(f"🔍 Recent order IDs in DB (using service role): {recent_orders}")
-        
-        return result.data
-    except Exception as e:
-        print(f"❌ Error updating order {order_id} status to '{status}': {str(e)}")
-        import traceback
-        traceback.print_exc()  # Tambahkan traceback lengkap
-        raise e
-
-def compute_cart_total(user_id: str):
-    sb = supabase_client()
-    items = sb.table("cart").select("*").eq("user_id", user_id).execute().data
-    total = 0.0
-    for it in items:
-        prod = sb.table("products").select("price").eq("id", it["product_id"]).single().execute().data
-        price = float(prod["price"]) if prod else 0.0
-        total += price * int(it["quantity"])
-    return total, items
+    """
+    Update status order dari webhook memakai client service role bersama
+    (melewati RLS). Satu round trip: update bersyarat `status <> status baru`
+    yang mengembalikan baris yang berubah, sehingga callback duplikat tidak
+    menulis apa pun dan mengembalikan list kosong.
+    """
+    return update_orders_status([order_id], status)
+
+def update_orders_status(order_ids: list, status: str):
+    # Bulk form of update_order_status: one round trip for a whole webhook batch
+    sb = service_client()
+    if sb is None:
+        log.error("Service role key not configured; cannot update order status")
+        return None
+
+    result = sb.table("orders").update({"status": status}).in_("order_id", order_ids).neq("status", status).execute()
+    log.info("Order status updated", extra={"status": status, "orders": len(order_ids), "rows_affected": len(result.data)})
+    return result.data
 
-def compute_selected_cart_total(user_id: str, product_ids: list):
+CART_PRICING_SELECT = "product_id, quantity, products(price, discount)"
+
+def price_cart(user_id: str, product_ids: list = None):
+    """
+    Ambil baris cart beserta harga produk dalam satu query (embedded join),
+    lalu hitung total. Return (total, lines) dengan lines berisi
+    product_id, quantity, price, dan discount yang siap dipakai untuk membuat order.
+    """
     sb = supabase_client()
-    items = sb.table("cart").select("*").eq("user_id", user_id).in_("product_id", product_ids).execute().data
+    query = sb.table("cart").select(CART_PRICING_SELECT).eq("user_id", user_id)
+    if product_ids is not None:
+        query = query.in_("product_id", product_ids)
+    rows = query.execute().data
+
     total = 0.0
-    for it in items:
-        prod = sb.table("products").select("price").eq("id", it["product_id"]).single().execute().data
-        price = float(prod["price"]) if prod else 0.0
-        total += price * int(it["quantity"])
-    return total, items
+    lines = []
+    for row in rows:
+        product = row.get("products")
+        if not product:
+            continue
+        line = {
+            "product_id": row["product_id"],
+            "quantity": int(row["quantity"]),
+            "price": product["price"],
+            "discount": product.get("discount", 0),
+        }
+        total += float(line["price"]) * line["quantity"]
+        lines.append(line)
+    return total, lines
 
-def create_order_and_clear_cart(user_id: str, total: float, address_id: str = None):
-    sb = supabase_client()
-    
-    # Get items from cart before clearing
-    cart_items = sb.table("cart").select("*").eq("user_id", user_id).execute().data
-    if not cart_items:
-        return None
-    
-    # Get product details for each cart item
-    order_items = []
-    for item in cart_items:
-        product = sb.table("products").select("price").eq("id", item["product_id"]).single().execute().data
-        if product:
-            order_item = {
-                "product_id": item["product_id"],
-                "quantity": item["quantity"],
-                "price": product["price"]
-            }
-            order_items.append(order_item)
-    
+ORDER_ITEMS_CHUNK_SIZE = 500
+ORDER_ITEMS_MAX_ATTEMPTS = 3
+
+def insert_order_items(sb, order_id: str, lines: list, chunk_size: int = ORDER_ITEMS_CHUNK_SIZE):
+    """
+    Simpan semua item order dengan bulk insert (satu request per `chunk_size` baris).
+    (order_id, product_id) unik, jadi upsert dengan ignore_duplicates membuat
+    replay/retry tidak menggandakan baris.
+    """
+    rows = [{
+        "order_id": order_id,
+        "product_id": item["product_id"],
+        "quantity": item["quantity"],
+        "price": item["price"]
+    } for item in lines]
+
+    for start in range(0, len(rows), chunk_size):
+        chunk = rows[start:start + chunk_size]
+        for attempt in range(ORDER_ITEMS_MAX_ATTEMPTS):
+            try:
+                sb.table("order_items").upsert(
+                    chunk,
+                    on_conflict="order_id,product_id",
+                    ignore_duplicates=True,
+                    returning=ReturnMethod.minimal,
+                ).execute()
+                break
+            except httpx.TransportError:
+                if attempt == ORDER_ITEMS_MAX_ATTEMPTS - 1:
+                    raise
+                time.sleep(0.1 * 2 ** attempt)
+
+def _insert_order(sb, user_id: str, total: float, lines: list, address_id: str = None):
     # Create the order
     order_data = {"user_id": user_id, "total_price": total, "status": "pending"}  # Changed to "pending"
     if address_id:
@@ -131,63 +173,137 @@ def create_order_and_clear_cart(user_id: str, total: float, address_id: str = No
     result = sb.table("orders").insert(order_data).execute()
     order = result.data[0]  # Supabase insert always returns a list in the data field
     
-    # Log the created order ID for debugging
-    print(f"🔍 Created order with ID: {order['order_id']}")
+    log.debug("Created order", extra={"order_id": order["order_id"]})
     
     # Add order items to order_items table
-    for item in order_items:
-        sb.table("order_items").insert({
-            "order_id": order["order_id"],
-            "product_id": item["product_id"],
-            "quantity": item["quantity"],
-            "price": item["price"]
-        }).execute()
-    
-    # Clear the cart
-    sb.table("cart").delete().eq("user_id", user_id).execute()
+    insert_order_items(sb, order["order_id"], lines)
     
     return order
 
-def create_order_and_clear_selected_cart(user_id: str, total: float, product_ids: list, address_id: str = None):
+def create_order_and_clear_cart(user_id: str, total: float, address_id: str = None, lines: list = None):
     sb = supabase_client()
     
-    # Get selected items from cart before clearing
-    cart_items = sb.table("cart").select("*").eq("user_id", user_id).in_("product_id", product_ids).execute().data
-    if not cart_items:
+    # Reuse the priced lines from price_cart when the caller has them
+    if lines is None:
+        total, lines = price_cart(user_id)
+    if not lines:
         return None
     
-    # Get product details for each cart item
-    order_items = []
-    for item in cart_items:
-        product = sb.table("products").select("price").eq("id", item["product_id"]).single().execute().data
-        if product:
-            order_item = {
-                "product_id": item["product_id"],
-                "quantity": item["quantity"],
-                "price": product["price"]
-            }
-            order_items.append(order_item)
+    order = _insert_order(sb, user_id, total, lines, address_id)
     
-    # Create the order
-    order_data = {"user_id": user_id, "total_price": total, "status": "pending"}  # Changed to "pending"
-    if address_id:
-        order_data["address_id"] = address_id
-    result = sb.table("orders").insert(order_data).execute()
-    order = result.data[0]  # Supabase insert always returns a list in the data field
+    # Clear the cart
+    sb.table("cart").delete().eq("user_id", user_id).execute()
     
-    # Log the created order ID for debugging
-    print(f"🔍 Created order with ID: {order['order_id']}")
+    return order
+
+def create_order_and_clear_selected_cart(user_id: str, total: float, product_ids: list, address_id: str = None, lines: list = None):
+    sb = supabase_client()
     
-    # Add order items to order_items table
-    for item in order_items:
-        sb.table("order_items").insert({
-            "order_id": order["order_id"],
-            "product_id": item["product_id"],
-            "quantity": item["quantity"],
-            "price": item["price"]
-        }).execute()
+    # Reuse the priced lines from price_cart when the caller has them
+    if lines is None:
+        total, lines = price_cart(user_id, product_ids)
+    if not lines:
+        return None
+    
+    order = _insert_order(sb, user_id, total, lines, address_id)
     
     # Clear only the selected items from cart
     sb.table("cart").delete().eq("user_id", user_id).in_("product_id", product_ids).execute()
     
     return order
+
+def checkout(user_id: str, address_id: str = None, product_ids: list = None):
+    """
+    Checkout atomik lewat fungsi `checkout_cart` di database (satu round trip,
+    satu transaksi). Return order beserta items, atau None jika cart kosong.
+    Jika fungsi belum dipasang di database, pakai alur multi-call lama.
+    """
+    sb = supabase_client()
+    try:
+        return sb.rpc("checkout_cart", {"p_address_id": address_id, "p_product_ids": product_ids}).execute().data
+    except APIError as e:
+        # PGRST202: function not found in the schema cache
+        if e.code != "PGRST202":
+            raise
+
+    if product_ids:
+        total, lines = price_cart(user_id, product_ids)
+        return create_order_and_clear_selected_cart(user_id, total, product_ids, address_id, lines)
+    total, lines = price_cart(user_id)
+    return create_order_and_clear_cart(user_id, total, address_id, lines)
+
+def checkout_with_address(user_id: str, address_id: str = None, product_ids: list = None):
+    """
+    Validasi alamat lalu checkout. `checkout_cart` sendiri menolak alamat yang
+    bukan milik user di dalam transaksinya, jadi cek alamat (untuk kode error
+    yang jelas) dan RPC dijalankan paralel. Tanpa address_id, alamat default
+    dicari lebih dulu. Return (error_code, address_id, order).
+    """
+    sb = supabase_client()
+    if not address_id:
+        addr = sb.table("addresses").select("id").eq("user_id", user_id).eq("is_default", True).limit(1).execute().data
+        if not addr:
+            return "ADDRESS_REQUIRED", None, None
+        return None, addr[0]["id"], checkout(user_id, addr[0]["id"], product_ids)
+
+    owned, result = parallel(
+        lambda: sb.table("addresses").select("id").eq("id", address_id).eq("user_id", user_id).limit(1).execute().data,
+        lambda: _checkout_rpc(sb, address_id, product_ids),
+    )
+    if not owned:
+        # checkout_cart raised 22023 for the same reason, so nothing was written
+        return "INVALID_ADDRESS", address_id, None
+    if isinstance(result, APIError):
+        if result.code != "PGRST202":
+            raise result
+        return None, address_id, checkout(user_id, address_id, product_ids)
+    return None, address_id, result
+
+def _checkout_rpc(sb, address_id: str, product_ids: list):
+    # Hold back API errors until the address check has been looked at
+    try:
+        return sb.rpc("checkout_cart", {"p_address_id": address_id, "p_product_ids": product_ids}).execute().data
+    except APIError as e:
+        return e
+
+# checkout_async result when the checkout_cart function is not installed yet
+CHECKOUT_RPC_MISSING = object()
+
+async def checkout_async(user_id: str, address_id: str = None, product_ids: list = None):
+    """
+    Checkout untuk mode ASYNC_IO. `checkout_cart` sendiri menolak alamat yang
+    bukan milik user di dalam transaksinya, jadi cek alamat (untuk kode error
+    yang jelas) dikirim bersamaan dengan RPC. Tanpa address_id, alamat default
+    dicari lebih dulu. Return (error_code, address_id, order); order berisi
+    CHECKOUT_RPC_MISSING jika fungsi belum dipasang di database.
+    """
+    sb = async_supabase_client()
+    rpc_params = {"p_address_id": address_id, "p_product_ids": product_ids}
+    if not address_id:
+        addr = (await sb.table("addresses").select("id").eq("user_id", user_id).eq("is_default", True).limit(1).execute()).data
+        if not addr:
+            return "ADDRESS_REQUIRED", None, None
+        address_id = rpc_params["p_address_id"] = addr[0]["id"]
+        owned, result = addr, await _gather_safe(sb.rpc("checkout_cart", rpc_params).execute())
+    else:
+        owned, result = await asyncio.gather(
+            sb.table("addresses").select("id").eq("id", address_id).eq("user_id", user_id).limit(1).execute(),
+            _gather_safe(sb.rpc("checkout_cart", rpc_params).execute()),
+        )
+        owned = owned.data
+    if not owned:
+        # checkout_cart raised 22023 for the same reason, so nothing was written
+        return "INVALID_ADDRESS", address_id, None
+    if isinstance(result, APIError):
+        # PGRST202: function not found in the schema cache
+        if result.code != "PGRST202":
+            raise result
+        return None, address_id, CHECKOUT_RPC_MISSING
+    return None, address_id, result.data
+
+async def _gather_safe(coro):
+    # Hold back API errors until the address check has been looked at
+    try:
+        return await coro
+    except APIError as e:
+        return e
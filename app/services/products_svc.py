@@ -1,14 +1,317 @@
+import logging
+from postgrest.exceptions import APIError
 from supabase import Client
-from ..extensions import supabase_client
+import base64
+import json
+from ..config import Config
+from ..extensions import supabase_client, anon_client, service_client
+from ..utils.cache import create_cache
+from .search_index import ProductSearchIndex
+from flask import current_app
+import threading
+import time
 
-def list_products(filters: dict, page: int, limit: int, sort: str, search_query: str = None):
-    sb = supabase_client()
-    query = sb.table("products").select("*")
+log = logging.getLogger(__name__)
+
+# Catalog cache: ("product", id) for detail, ("list", ...) for listing queries.
+# Admin writes below invalidate it (on every worker when CACHE_URL points at Redis).
+catalog_cache = create_cache(Config.CACHE_URL, "catalog", maxsize=Config.CATALOG_CACHE_SIZE, ttl=Config.CATALOG_CACHE_TTL)
+_MISS = object()
+
+def invalidate_catalog(prod_id: str = None):
+    catalog_cache.bump("catalog")
+    if prod_id is not None:
+        catalog_cache.delete(("product", prod_id))
+    catalog_cache.delete_prefix(("list",))
+    catalog_cache.delete_prefix(("facets",))
+
+def catalog_version() -> tuple:
+    """
+    Return (version, last_modified) of the catalog, used as HTTP validators.
+    The version changes on every admin write and also rolls over every cache
+    TTL, since sold_count/rating change without an admin write (and, with the
+    in-memory backend, writes on other workers are invisible here).
+    """
+    counter, bumped_at = catalog_cache.version("catalog")
+    ttl = Config.CATALOG_CACHE_TTL
+    window = int(time.time() // ttl)
+    return f"{counter}.{window}", max(bumped_at or 0, window * ttl)
+
+def catalog_cache_stats() -> dict:
+    return catalog_cache.stats()
+
+# Optional in-process search index; None when SEARCH_INDEX_ENABLED is off
+search_index = ProductSearchIndex() if Config.SEARCH_INDEX_ENABLED else None
+_search_index_lock = threading.Lock()
+SEARCH_INDEX_PAGE_SIZE = 1000
+
+def _load_search_index(app):
+    try:
+        with app.app_context():
+            sb = anon_client()
+            rows, start = [], 0
+            while True:
+                page = (
+                    sb.table("products").select(PRODUCT_COLUMNS)
+                    .order("id").range(start, start + SEARCH_INDEX_PAGE_SIZE - 1)
+                    .execute().data
+                )
+                rows.extend(page)
+                if len(page) < SEARCH_INDEX_PAGE_SIZE:
+                    break
+                start += SEARCH_INDEX_PAGE_SIZE
+        search_index.rebuild(rows)
+    except Exception:
+        log.exception("Building search index failed")
+    finally:
+        search_index.building = False
+
+def warm_search_index(app=None):
+    """Start a background (re)build if the index is cold or older than SEARCH_INDEX_REFRESH."""
+    if search_index is None:
+        return
+    fresh = search_index.ready and time.time() - search_index.built_at < Config.SEARCH_INDEX_REFRESH
+    if fresh or search_index.building:
+        return
+    with _search_index_lock:
+        if search_index.building:
+            return
+        search_index.building = True
+    app = app or current_app._get_current_object()
+    threading.Thread(target=_load_search_index, args=(app,), daemon=True).start()
+
+def run_listing_refresher(app, stop: threading.Event = None):
+    """Refresh the product_cards view every LISTING_REFRESH_INTERVAL until `stop` is set (see scripts/refresh_listings.py)."""
+    stop = stop or threading.Event()
+    while not stop.is_set():
+        try:
+            with app.app_context():
+                sb = service_client()
+                if sb is None:
+                    log.error("Service role key not configured; cannot refresh product listings")
+                    return
+                status = sb.rpc("refresh_product_cards", {}).execute().data or {}
+                log.info("Product listings checked", extra=status)
+        except Exception:
+            log.exception("Refreshing product listings failed")
+        stop.wait(app.config["LISTING_REFRESH_INTERVAL"])
+
+# Last product_cards_status() result in this process; the state itself lives in listing_state
+_listing_status = {}
+_listing_status_lock = threading.Lock()
+
+def listing_status() -> dict:
+    """
+    Status view product_cards dari database (refreshed_at, dirty_since,
+    staleness_seconds), dibaca lewat product_cards_status() paling sering
+    sekali per LISTING_STATUS_TTL detik per proses. Kosong jika fungsi itu
+    belum dipasang atau tidak bisa dibaca.
+    """
+    global _listing_status
+    status = _listing_status
+    if time.time() - status.get("checked_at", 0) < current_app.config["LISTING_STATUS_TTL"]:
+        return dict(status)
+    # One request per process re-reads it; the others keep the previous result meanwhile
+    if not _listing_status_lock.acquire(blocking=False):
+        return dict(status)
+    try:
+        try:
+            status = anon_client().rpc("product_cards_status", {}).execute().data or {}
+        except Exception as e:
+            log.warning("Reading product listing status failed", extra={"error": str(e)})
+            status = {}
+        status["checked_at"] = time.time()
+        _listing_status = status
+    finally:
+        _listing_status_lock.release()
+    return dict(status)
+
+def _listing_view_fresh() -> bool:
+    """
+    True jika product_cards boleh dipakai: status dari database terbaca dan
+    view tertinggal paling lama LISTING_MAX_STALENESS detik (jika refresher
+    mati, staleness terus naik sampai batas ini). Selain itu baca tabel products.
+    """
+    staleness = listing_status().get("staleness_seconds")
+    if staleness is None:
+        return False
+    return float(staleness) <= current_app.config["LISTING_MAX_STALENESS"]
+
+def search_index_stats() -> dict:
+    if search_index is None:
+        return {"enabled": False}
+    return {"enabled": True, **search_index.stats()}
+
+def _indexed_search(filters: dict, page: int, limit: int, sort: str, search_query: str, after: dict = None):
+    # None means "not served from the index", so the caller goes to Supabase
+    if search_index is None:
+        return None
+    warm_search_index()
+    if not search_index.ready:
+        return None
+    column, desc = _sort_key(sort)
+    ids = search_index.search(
+        search_query, filters, column, desc, relevance=(sort == "relevance"),
+        offset=0 if after is not None else (page - 1) * limit, limit=limit, after=after,
+    )
+    return _hydrate(ids)
+
+def _hydrate(ids: list) -> list:
+    # The index only holds ids and sort/filter columns: full rows come from the
+    # catalog cache, and the misses from a single `in` query
+    rows, missing = {}, []
+    for prod_id in ids:
+        row = catalog_cache.get(("product", prod_id), _MISS)
+        if row is _MISS:
+            missing.append(prod_id)
+        elif row is not None:
+            rows[prod_id] = row
+    if missing:
+        for row in supabase_client().table("products").select(PRODUCT_COLUMNS).in_("id", missing).execute().data:
+            catalog_cache.set(("product", row["id"]), row)
+            rows[row["id"]] = row
+    return [rows[prod_id] for prod_id in ids if prod_id in rows]
+
+# Named response shapes. `image` is the first entry of `images`; grids and cart
+# lines only need that one thumbnail instead of the whole jsonb array.
+PROJECTIONS = {
+    "card": ("id", "name", "brand", "category", "image", "price", "discount", "rating", "review_count", "sold_count", "created_at"),
+    "detail": ("id", "name", "brand", "category", "images", "price", "discount", "rating", "review_count", "sold_count", "created_at"),
+    "cart_line": ("id", "name", "brand", "image", "price"),
+}
+PRODUCT_FIELDS = frozenset(PROJECTIONS["detail"]) | {"image"}
+
+def resolve_fields(view: str = None, fields: str = None):
+    """
+    Ubah `?fields=a,b` atau `?view=card` menjadi tuple field; None berarti
+    bentuk default. Raise ValueError untuk view/field yang tidak dikenal.
+    """
+    if fields:
+        requested = [f.strip() for f in fields.split(",") if f.strip()]
+        unknown = [f for f in requested if f not in PRODUCT_FIELDS]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+        return tuple(dict.fromkeys(["id", *requested]))
+    if view:
+        if view not in PROJECTIONS:
+            raise ValueError(f"Unknown view '{view}', expected one of: {', '.join(PROJECTIONS)}")
+        return PROJECTIONS[view]
+    return None
+
+def select_columns(fields, source: str = "products") -> str:
+    # product_cards already stores `image`; on products it is projected out of the jsonb
+    if source == "products":
+        return ",".join("image:images->>0" if f == "image" else f for f in fields)
+    return ",".join(fields)
 
-    # Apply search filter if search_query is provided
+def _project(rows: list, fields) -> list:
+    if fields is None:
+        return rows
+    out = []
+    for row in rows:
+        item = {f: row.get(f) for f in fields if f != "image"}
+        if "image" in fields:
+            images = row.get("images") or []
+            item["image"] = row.get("image") or (images[0] if images else None)
+        out.append(item)
+    return out
+
+# Every API-visible column (excludes the search_tsv index column)
+PRODUCT_COLUMNS = select_columns(PROJECTIONS["detail"])
+
+# Sorts served from the product_cards view when a card projection is requested
+CARD_SORTS = ("bestseller", "sold_desc", "rating_desc")
+
+# sort name -> (column, descending); ties are broken by id ascending
+SORT_KEYS = {
+    "bestseller": ("sold_count", True),
+    "sold_desc": ("sold_count", True),
+    "rating_desc": ("rating", True),
+    "price_asc": ("price", False),
+    "price_desc": ("price", True),
+}
+DEFAULT_SORT_KEY = ("created_at", True)
+
+def _sort_key(sort: str):
+    return SORT_KEYS.get(sort, DEFAULT_SORT_KEY)
+
+def _cursor_sort(sort: str) -> str:
+    # Column and direction, e.g. "price.desc": a cursor only continues the same ordering
+    column, desc = _sort_key(sort)
+    return f"{column}.{'desc' if desc else 'asc'}"
+
+def encode_cursor(row: dict, sort: str) -> str:
+    column, _ = _sort_key(sort)
+    raw = json.dumps({"s": _cursor_sort(sort), "v": row.get(column), "id": row["id"]}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor: str, sort: str) -> dict:
+    """Raise ValueError if the cursor is malformed or was issued for another sort."""
+    if sort == "relevance":
+        raise ValueError("Cursor pagination is not available for relevance sort")
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        value, last_id = data["v"], data["id"]
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if data.get("s") != _cursor_sort(sort) or value is None:
+        raise ValueError("Cursor does not match sort")
+    return {"v": value, "id": last_id}
+
+def next_cursor(data: list, sort: str, limit: int):
+    # A full page means there may be more rows after it
+    if len(data) < limit or sort == "relevance":
+        return None
+    return encode_cursor(data[-1], sort)
+
+def list_products(filters: dict, page: int, limit: int, sort: str, search_query: str = None, cursor: str = None, fields: tuple = None):
+    """
+    Offset pagination (`page`) secara default; jika `cursor` diberikan, pakai
+    keyset pagination (kolom sort + id) dan abaikan `page`. `fields` (lihat
+    resolve_fields) membatasi kolom yang diambil dari database.
+    """
+    after = decode_cursor(cursor, sort) if cursor else None
+    if fields is not None:
+        # Keyset cursors need the sort column and id of the last row
+        fields = tuple(dict.fromkeys([*fields, "id", _sort_key(sort)[0]]))
     if search_query:
-        query = query.ilike("name", f"%{search_query}%")
+        data = _indexed_search(filters, page, limit, sort, search_query, after)
+        if data is not None:
+            return _project(data, fields)
+    key = ("list", tuple(sorted(filters.items())), page, limit, sort, search_query, cursor, fields)
+    data = catalog_cache.get(key, _MISS)
+    if data is _MISS:
+        data = _query_products(filters, page, limit, sort, search_query, after, fields)
+        catalog_cache.set(key, data)
+    return data
+
+def _query_products(filters: dict, page: int, limit: int, sort: str, search_query: str = None, after: dict = None, fields: tuple = None):
+    sb = supabase_client()
+    columns = PRODUCT_COLUMNS if fields is None else select_columns(fields)
+    if not search_query and sort in CARD_SORTS and fields is not None and "images" not in fields and _listing_view_fresh():
+        # Card projections are served pre-sorted from the product_cards materialized view
+        try:
+            return _run_listing(sb.table("product_cards").select(select_columns(fields, "product_cards")), filters, page, limit, sort, after)
+        except APIError as e:
+            # PGRST205: relation not found in the schema cache
+            if e.code not in ("PGRST205", "42P01"):
+                raise
+    if not search_query:
+        return _run_listing(sb.table("products").select(columns), filters, page, limit, sort, after)
+
+    # Ranked full-text + trigram search (sql/ddl_rls.sql: search_products)
+    try:
+        query = sb.rpc("search_products", {"q": search_query}).select(columns)
+        return _run_listing(query, filters, page, limit, sort, after, ranked=True)
+    except APIError as e:
+        # PGRST202: function not found in the schema cache
+        if e.code != "PGRST202":
+            raise
+    query = sb.table("products").select(columns).ilike("name", f"%{search_query}%")
+    return _run_listing(query, filters, page, limit, sort, after)
 
+def _run_listing(query, filters: dict, page: int, limit: int, sort: str, after: dict = None, ranked: bool = False):
     if (brand := filters.get("brand")):
         query = query.eq("brand", brand)
     if (category := filters.get("category")):
@@ -20,34 +323,70 @@ def list_products(filters: dict, page: int, limit: int, sort: str, search_query:
     if (min_rating := filters.get("min_rating")) is not None:
         query = query.gte("rating", min_rating)
 
-    # Sorting
-    if sort == "bestseller" or sort == "sold_desc":
-        query = query.order("sold_count", desc=True)
-    elif sort == "rating_desc":
-        query = query.order("rating", desc=True)
-    elif sort == "price_asc":
-        query = query.order("price", desc=False)
-    elif sort == "price_desc":
-        query = query.order("price", desc=True)
-    else:
-        query = query.order("created_at", desc=True)
+    # Sorting ("relevance" keeps the rank order returned by search_products)
+    column, desc = _sort_key(sort)
+    if not (ranked and sort == "relevance"):
+        query = query.order(column, desc=desc).order("id")
+
+    if after is not None:
+        # Keyset: rows strictly after (value, id) in (column, id) order
+        op = "lt" if desc else "gt"
+        value = json.dumps(str(after["v"]))
+        last_id = json.dumps(str(after["id"]))
+        query = query.or_(f"{column}.{op}.{value},and({column}.eq.{value},id.gt.{last_id})")
+        return query.limit(limit).execute().data
 
     start = (page - 1) * limit
     end = start + limit - 1
     data = query.range(start, end).execute().data
     return data
 
+def product_facets(filters: dict, search_query: str = None):
+    """
+    Hitung facet brand/category/harga/rating untuk filter saat ini lewat satu
+    panggilan fungsi `product_facets`; hasil di-cache per kombinasi filter.
+    """
+    key = ("facets", tuple(sorted(filters.items())), search_query)
+    data = catalog_cache.get(key, _MISS)
+    if data is _MISS:
+        params = {
+            "p_q": search_query or None,
+            "p_brand": filters.get("brand"),
+            "p_category": filters.get("category"),
+            "p_min_price": filters.get("min_price"),
+            "p_max_price": filters.get("max_price"),
+            "p_min_rating": filters.get("min_rating"),
+        }
+        data = supabase_client().rpc("product_facets", params).execute().data
+        catalog_cache.set(key, data)
+    return data
+
 def get_product(prod_id: str):
+    key = ("product", prod_id)
+    data = catalog_cache.get(key, _MISS)
+    if data is not _MISS:
+        return data
     try:
-        result = supabase_client().table("products").select("*").eq("id", prod_id).single().execute()
-        return result.data
+        result = supabase_client().table("products").select(PRODUCT_COLUMNS).eq("id", prod_id).single().execute()
     except Exception as e:
-        print(f"Error getting product {prod_id}: {str(e)}")
+        log.warning("Getting product failed", extra={"product_id": prod_id, "error": str(e)})
         return None
+    if result.data:
+        catalog_cache.set(key, result.data)
+    return result.data
 
 def admin_upsert_product(payload: dict):
     # insert or update by id
-    return supabase_client().table("products").upsert(payload).execute().data
+    data = supabase_client().table("products").upsert(payload).execute().data
+    invalidate_catalog(payload.get("id"))
+    if search_index is not None and search_index.ready:
+        for row in data or []:
+            search_index.upsert({k: row.get(k) for k in PRODUCT_COLUMNS.split(",")})
+    return data
 
 def admin_delete_product(prod_id: str):
-    return supabase_client().table("products").delete().eq("id", prod_id).execute().data
+    data = supabase_client().table("products").delete().eq("id", prod_id).execute().data
+    invalidate_catalog(prod_id)
+    if search_index is not None:
+        search_index.remove(prod_id)
+    return data
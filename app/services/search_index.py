@@ -0,0 +1,289 @@
+import heapq
+import re
+import sys
+import threading
+import time
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from datetime import datetime
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Field weights for relevance, mirroring setweight A/B/C in search_products
+_FIELD_WEIGHTS = (("name", 3), ("brand", 2), ("category", 1))
+
+# Numeric columns kept per product (sort keys and range filters)
+_NUMERIC = ("price", "rating", "sold_count", "created_at")
+
+# Prefixes up to this length have their own postings (max weight per product),
+# so a one- or two-letter query reads one list instead of merging thousands of tokens
+_SHORT_PREFIX = 3
+
+# Below this share of the catalog a query's matches are ranked with a heap;
+# above it the presorted order (sort column, or id for relevance) is walked until the page is full
+_WALK_SHARE = 0.05
+
+def tokenize(text: str) -> list:
+    return _TOKEN_RE.findall((text or "").lower())
+
+def _number(column: str, value) -> float:
+    # created_at is compared as epoch seconds; missing values sort as 0 (like `or 0` in filters)
+    if column == "created_at":
+        return datetime.fromisoformat(value).timestamp() if value else 0.0
+    return float(value or 0)
+
+class ProductSearchIndex:
+    """
+    Inverted index produk di memori proses untuk pencarian typeahead tanpa
+    query full-text ke database. Hanya id, kolom numerik (sort dan filter
+    rentang) dan kode brand/category yang disimpan, per kolom; baris lengkap
+    diambil per halaman oleh pemanggil. Setiap kata di query dicocokkan
+    sebagai prefix token name/brand/category.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._ids = []                                        # position -> product id (None when removed)
+        self._positions = {}                                  # product id -> position
+        self._columns = {c: array("d") for c in _NUMERIC}     # column -> value per position
+        self._brand = array("l")                              # position -> code in self._labels
+        self._category = array("l")
+        self._labels = {}                                     # brand/category value -> code
+        self._postings = {}                                   # token -> (positions, weights), positions ascending
+        self._short = {}                                      # prefix of <= _SHORT_PREFIX chars -> (positions, weights)
+        self._tokens = []                                     # sorted token list for prefix lookups
+        self._orders = {}                                     # (column, desc) -> positions in that sort order
+        self._version = 0
+        self._size = (None, 0)                                # (version, bytes) of the last size estimate
+        self.built_at = None
+        self.building = False
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    def rebuild(self, rows: list):
+        fresh = ProductSearchIndex()
+        for row in rows:
+            fresh._add(row, sort_tokens=False)
+        fresh._tokens = sorted(fresh._postings)
+        # Sort orders already in use are rebuilt here, outside the lock, instead of by the next query
+        for column, desc in list(self._orders):
+            fresh._order(column, desc)
+        with self._lock:
+            self._ids = fresh._ids
+            self._positions = fresh._positions
+            self._columns = fresh._columns
+            self._brand, self._category, self._labels = fresh._brand, fresh._category, fresh._labels
+            self._postings = fresh._postings
+            self._short = fresh._short
+            self._tokens = fresh._tokens
+            self._orders = fresh._orders
+            self._version += 1
+            self.built_at = time.time()
+
+    def upsert(self, row: dict):
+        with self._lock:
+            self._remove(row["id"])
+            pos = self._add(row)
+            for (column, desc), order in self._orders.items():
+                insort(order, pos, key=self._order_key(column, desc))
+            self._version += 1
+
+    def remove(self, prod_id: str):
+        with self._lock:
+            self._remove(prod_id)
+            self._version += 1
+
+    def _label(self, value) -> int:
+        code = self._labels.get(value)
+        if code is None:
+            code = self._labels[value] = len(self._labels)
+        return code
+
+    def _add(self, row: dict, sort_tokens: bool = True) -> int:
+        pos = len(self._ids)
+        self._ids.append(row["id"])
+        self._positions[row["id"]] = pos
+        for column in _NUMERIC:
+            self._columns[column].append(_number(column, row.get(column)))
+        self._brand.append(self._label(row.get("brand")))
+        self._category.append(self._label(row.get("category")))
+
+        weights = {}
+        for field, weight in _FIELD_WEIGHTS:
+            for token in tokenize(row.get(field)):
+                weights[token] = max(weights.get(token, 0), weight)
+        short = {}
+        for token, weight in weights.items():
+            posting = self._postings.get(token)
+            if posting is None:
+                posting = self._postings[token] = (array("l"), array("b"))
+                if sort_tokens:
+                    insort(self._tokens, token)
+            # Positions only grow, so every posting stays sorted by position
+            posting[0].append(pos)
+            posting[1].append(weight)
+            for n in range(1, min(len(token), _SHORT_PREFIX) + 1):
+                short[token[:n]] = max(short.get(token[:n], 0), weight)
+        for prefix, weight in short.items():
+            posting = self._short.get(prefix)
+            if posting is None:
+                posting = self._short[prefix] = (array("l"), array("b"))
+            posting[0].append(pos)
+            posting[1].append(weight)
+        return pos
+
+    def _remove(self, prod_id: str):
+        # Tombstone: postings and sort orders skip the dead position until the next rebuild
+        pos = self._positions.pop(prod_id, None)
+        if pos is not None:
+            self._ids[pos] = None
+
+    def _order_key(self, column: str, desc: bool):
+        # Sort value (descending when asked), ties broken by id ascending
+        ids = self._ids
+        if column == "id":
+            return lambda pos: ids[pos] or ""
+        values = self._columns[column]
+        if desc:
+            return lambda pos: (-values[pos], ids[pos] or "")
+        return lambda pos: (values[pos], ids[pos] or "")
+
+    def _order(self, column: str, desc: bool) -> list:
+        order = self._orders.get((column, desc))
+        if order is None:
+            live = [pos for pos, prod_id in enumerate(self._ids) if prod_id is not None]
+            order = self._orders[(column, desc)] = sorted(live, key=self._order_key(column, desc))
+        return order
+
+    def _match_prefix(self, prefix: str) -> dict:
+        if len(prefix) <= _SHORT_PREFIX:
+            positions, weights = self._short.get(prefix, ((), ()))
+            return dict(zip(positions, weights))
+        scores = {}
+        i = bisect_left(self._tokens, prefix)
+        while i < len(self._tokens) and self._tokens[i].startswith(prefix):
+            positions, weights = self._postings[self._tokens[i]]
+            for pos, weight in zip(positions, weights):
+                if weight > scores.get(pos, 0):
+                    scores[pos] = weight
+            i += 1
+        return scores
+
+    def _filter(self, filters: dict):
+        # Predicate over positions: live and matching every filter that is set
+        ids, labels, price, rating = self._ids, self._labels, self._columns["price"], self._columns["rating"]
+        brand = labels.get(filters["brand"], -1) if filters.get("brand") else None
+        category = labels.get(filters["category"], -1) if filters.get("category") else None
+        min_price, max_price, min_rating = filters.get("min_price"), filters.get("max_price"), filters.get("min_rating")
+        if brand is None and category is None and min_price is None and max_price is None and min_rating is None:
+            return lambda pos: ids[pos] is not None
+
+        def passes(pos: int) -> bool:
+            return (
+                ids[pos] is not None
+                and (brand is None or self._brand[pos] == brand)
+                and (category is None or self._category[pos] == category)
+                and (min_price is None or price[pos] >= min_price)
+                and (max_price is None or price[pos] <= max_price)
+                and (min_rating is None or rating[pos] >= min_rating)
+            )
+        return passes
+
+    def search(self, q: str, filters: dict, sort_column: str, desc: bool, relevance: bool = False,
+               offset: int = 0, limit: int = 20, after: dict = None) -> list:
+        """
+        Return id produk untuk satu halaman hasil: `offset`/`limit`, atau
+        `limit` baris setelah cursor `after` ({"v", "id"}, lihat decode_cursor).
+        Urutan relevance: skor tertinggi lalu id; selain itu kolom sort lalu id.
+        """
+        words = tokenize(q)
+        if not words:
+            return []
+        wanted = offset + limit if after is None else limit
+        with self._lock:
+            scores = None
+            for word in words:
+                matched = self._match_prefix(word)
+                if scores is None:
+                    scores = matched
+                else:
+                    scores = {pos: scores[pos] + w for pos, w in matched.items() if pos in scores}
+                if not scores:
+                    return []
+            ids, passes = self._ids, self._filter(filters)
+
+            many = len(scores) >= _WALK_SHARE * len(self._positions)
+            if relevance:
+                # Scores are small integers: fill the page from the best score down, ids ascending inside
+                top = []
+                for score in sorted(set(scores.values()), reverse=True):
+                    need = wanted - len(top)
+                    if many:
+                        # Walk the id order (stops early for the large buckets of short prefixes)
+                        for pos in self._order("id", False):
+                            if scores.get(pos) == score and passes(pos):
+                                top.append(pos)
+                                need -= 1
+                                if not need:
+                                    break
+                    else:
+                        hits = [pos for pos, s in scores.items() if s == score and passes(pos)]
+                        top.extend(heapq.nsmallest(need, hits, key=ids.__getitem__))
+                    if len(top) >= wanted:
+                        break
+                return [ids[pos] for pos in top[offset:]]
+
+            key = self._order_key(sort_column, desc)
+            start = None
+            if after is not None:
+                value = _number(sort_column, after["v"])
+                start = (-value if desc else value, after["id"])
+            if not many:
+                # Few matches: rank just those
+                hits = (pos for pos in scores if (start is None or key(pos) > start) and passes(pos))
+                top = heapq.nsmallest(wanted, hits, key=key)
+            else:
+                # Many matches (short prefixes): walk the presorted order until the page is full
+                order = self._order(sort_column, desc)
+                i = 0 if start is None else bisect_right(order, start, key=key)
+                top = []
+                while i < len(order) and len(top) < wanted:
+                    pos = order[i]
+                    if pos in scores and passes(pos):
+                        top.append(pos)
+                    i += 1
+            return [ids[pos] for pos in top[offset:]]
+
+    def stats(self) -> dict:
+        with self._lock:
+            # Snapshot references only; the estimate itself runs outside the lock
+            version, cached = self._version, self._size
+            parts = (self._ids, self._positions, self._columns, self._brand, self._category,
+                     self._labels, self._postings, self._short, self._tokens, self._orders)
+            live, tokens = len(self._positions), len(self._postings)
+        if cached[0] == version:
+            size = cached[1]
+        else:
+            size = _approx_size(*parts)
+            self._size = (version, size)
+        return {
+            "ready": self.ready,
+            "built_at": self.built_at,
+            "products": live,
+            "tokens": tokens,
+            "approx_bytes": size,
+            "approx_bytes_per_product": size // live if live else 0,
+        }
+
+def _approx_size(ids, positions, columns, brand, category, labels, postings, short, tokens, orders) -> int:
+    # Container sizes plus their strings and arrays; small ints and floats are shared or inline
+    size = sys.getsizeof(ids) + sum(sys.getsizeof(i) for i in ids if i is not None)
+    size += sys.getsizeof(positions) + sys.getsizeof(brand) + sys.getsizeof(category) + sys.getsizeof(labels)
+    size += sum(sys.getsizeof(a) for a in columns.values())
+    size += sys.getsizeof(tokens)
+    for table in (postings, short):
+        size += sys.getsizeof(table) + sum(sys.getsizeof(t) + sys.getsizeof(p) + sys.getsizeof(w) for t, (p, w) in list(table.items()))
+    size += sum(sys.getsizeof(o) for o in list(orders.values()))
+    return size
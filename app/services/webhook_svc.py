@@ -0,0 +1,189 @@
+import logging
+import os
+import random
+import threading
+import time
+import uuid
+from flask import current_app
+from ..utils.queue import create_queue
+from .orders_svc import update_order_status, update_orders_status
+
+log = logging.getLogger(__name__)
+
+# Xendit invoice status -> order status
+WEBHOOK_STATUSES = {"PAID": "paid", "EXPIRED": "pending", "FAILED": "pending"}
+
+_queue = None
+_queue_lock = threading.Lock()
+_metrics_lock = threading.Lock()
+_metrics = {
+    "processed": 0,
+    "retried": 0,
+    "dead": 0,
+    "batches": 0,
+    "last_batch_at": None,
+    "last_lag_seconds": None,
+    "max_lag_seconds": 0.0,
+}
+
+def webhook_queue():
+    global _queue
+    if _queue is None:
+        with _queue_lock:
+            if _queue is None:
+                config = current_app.config
+                _queue = create_queue(
+                    config["WEBHOOK_QUEUE_URL"],
+                    "webhooks",
+                    os.path.join(current_app.instance_path, "webhook_queue.sqlite3"),
+                    dedupe_ttl=config["WEBHOOK_DEDUPE_TTL"],
+                )
+    return _queue
+
+def enqueue_webhook(data: dict) -> bool:
+    """
+    Simpan callback Xendit ke antrian untuk diproses worker. Return False jika
+    status tidak relevan, external_id bukan UUID order, atau event yang sama
+    (external_id + status) sudah masuk.
+    """
+    status = data.get("status")
+    order_id = data.get("external_id")
+    if status not in WEBHOOK_STATUSES or not _is_uuid(order_id):
+        return False
+    return webhook_queue().put(f"{order_id}:{status}", {"external_id": order_id, "status": status})
+
+def _is_uuid(value) -> bool:
+    # orders.order_id is a uuid; anything else would make Postgres reject the whole bulk update
+    try:
+        uuid.UUID(str(value))
+    except ValueError:
+        return False
+    return True
+
+def drain_webhooks(batch_size: int = None) -> int:
+    """
+    Proses satu batch event dari antrian. Dalam satu batch hanya event terakhir
+    per order yang dipakai, dan order dikelompokkan per status tujuan sehingga
+    tiap status cukup satu update bulk. Jika update bulk gagal, order di grup
+    itu diterapkan satu per satu sehingga hanya event yang gagal yang dicoba
+    lagi (exponential backoff sampai WEBHOOK_MAX_ATTEMPTS). Return jumlah event.
+    """
+    config = current_app.config
+    queue = webhook_queue()
+    events = queue.claim(batch_size or config["WEBHOOK_BATCH_SIZE"], lease=config["WEBHOOK_LEASE_SECONDS"])
+    if not events:
+        return 0
+
+    latest = {}
+    for event in events:
+        latest[event["payload"]["external_id"]] = event
+    by_status = {}
+    for order_id, event in latest.items():
+        by_status.setdefault(WEBHOOK_STATUSES[event["payload"]["status"]], []).append(order_id)
+
+    try:
+        failed = _apply_status_groups(by_status)
+    except ServiceKeyMissing as e:
+        # Nothing can be applied (e.g. no service role key): retry the whole batch
+        log.warning("Applying webhook batch failed", extra={"events": len(events), "error": str(e)})
+        _retry_or_fail(queue, events)
+        return len(events)
+
+    # Superseded events of an order are settled by its latest event, retried or not
+    retry = [latest[order_id] for order_id in failed]
+    if retry:
+        _retry_or_fail(queue, retry)
+    retry_ids = {event["id"] for event in retry}
+    queue.ack([event["id"] for event in events if event["id"] not in retry_ids])
+    now = time.time()
+    lag = max(now - event["enqueued_at"] for event in events)
+    with _metrics_lock:
+        _metrics["processed"] += len(events) - len(retry)
+        _metrics["batches"] += 1
+        _metrics["last_batch_at"] = now
+        _metrics["last_lag_seconds"] = round(lag, 3)
+        _metrics["max_lag_seconds"] = round(max(_metrics["max_lag_seconds"], lag), 3)
+    return len(events)
+
+class ServiceKeyMissing(RuntimeError):
+    pass
+
+def _apply_status(order_ids: list, status: str):
+    # A single order (and the per-order fallback) goes through update_order_status
+    if len(order_ids) == 1:
+        result = update_order_status(order_ids[0], status)
+    else:
+        result = update_orders_status(order_ids, status)
+    if result is None:
+        raise ServiceKeyMissing("service role key is not configured")
+
+def _apply_status_groups(by_status: dict) -> list:
+    # One bulk update per status; if it fails, retry that group per order. Returns the failed order ids
+    failed = []
+    for status, order_ids in by_status.items():
+        try:
+            _apply_status(order_ids, status)
+            continue
+        except ServiceKeyMissing:
+            raise
+        except Exception as e:
+            if len(order_ids) > 1:
+                log.warning("Bulk webhook update failed; applying events one by one", extra={"status": status, "orders": len(order_ids), "error": str(e)})
+            else:
+                log.warning("Applying webhook event failed", extra={"order_id": order_ids[0], "status": status, "error": str(e)})
+                failed.extend(order_ids)
+                continue
+        for order_id in order_ids:
+            try:
+                _apply_status([order_id], status)
+            except ServiceKeyMissing:
+                raise
+            except Exception as e:
+                log.warning("Applying webhook event failed", extra={"order_id": order_id, "status": status, "error": str(e)})
+                failed.append(order_id)
+    return failed
+
+def _retry_or_fail(queue, events: list):
+    config = current_app.config
+    retried = dead = 0
+    for event in events:
+        if event["attempts"] >= config["WEBHOOK_MAX_ATTEMPTS"]:
+            queue.fail(event)
+            dead += 1
+        else:
+            # Exponential backoff with jitter, capped
+            delay = min(config["WEBHOOK_BACKOFF_MAX"], config["WEBHOOK_BACKOFF_BASE"] * 2 ** (event["attempts"] - 1))
+            queue.retry(event, delay * random.uniform(0.5, 1.0))
+            retried += 1
+    with _metrics_lock:
+        _metrics["retried"] += retried
+        _metrics["dead"] += dead
+
+def run_webhook_worker(app, stop: threading.Event = None):
+    """Drain the webhook queue until `stop` is set; sleeps WEBHOOK_POLL_INTERVAL when idle."""
+    stop = stop or threading.Event()
+    last_purge = 0.0
+    while not stop.is_set():
+        try:
+            with app.app_context():
+                drained = drain_webhooks()
+                if time.time() - last_purge > 3600:
+                    webhook_queue().purge()
+                    last_purge = time.time()
+        except Exception:
+            log.exception("Draining webhook queue failed")
+            drained = 0
+        if not drained:
+            stop.wait(app.config["WEBHOOK_POLL_INTERVAL"])
+
+def start_webhook_worker(app):
+    """Drain the queue in a background thread of this process; opt-in with WEBHOOK_WORKER_THREAD=true (scripts/webhook_worker.py is the supported consumer)."""
+    if not app.config["WEBHOOK_WORKER_THREAD"]:
+        return
+    threading.Thread(target=run_webhook_worker, args=(app,), daemon=True).start()
+
+def webhook_queue_stats() -> dict:
+    # Queue depth/lag come from the shared store; counters are for workers in this process
+    with _metrics_lock:
+        worker = dict(_metrics)
+    return {"queue": webhook_queue().stats(), "worker": worker}
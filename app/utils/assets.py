@@ -0,0 +1,86 @@
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+from flask import send_from_directory
+from .compression import available_encodings, negotiate_encoding, compress
+
+DIST_DIR = "dist"
+MANIFEST_NAME = "manifest.json"
+PRECOMPRESS_EXTENSIONS = {".js", ".css", ".svg", ".html", ".json", ".txt"}
+ENCODING_SUFFIX = {"br": ".br", "gzip": ".gz"}
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+
+def build_static(static_folder: str) -> dict:
+    """
+    Salin setiap file di static/ ke static/dist/ dengan hash konten di nama file,
+    buat varian .gz/.br untuk file teks, dan tulis manifest (path asli -> path hash).
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    manifest = {}
+    for root, dirs, files in os.walk(static_folder):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != dist]
+        for name in sorted(files):
+            src = os.path.join(root, name)
+            rel = os.path.relpath(src, static_folder).replace(os.sep, "/")
+            with open(src, "rb") as f:
+                data = f.read()
+            stem, ext = os.path.splitext(rel)
+            hashed = f"{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+            out = os.path.join(static_folder, hashed)
+            os.makedirs(os.path.dirname(out), exist_ok=True)
+            with open(out, "wb") as f:
+                f.write(data)
+            if ext.lower() in PRECOMPRESS_EXTENSIONS:
+                for encoding in available_encodings():
+                    with open(out + ENCODING_SUFFIX[encoding], "wb") as f:
+                        f.write(compress(data, encoding, 11))
+            manifest[rel] = hashed
+    with open(os.path.join(dist, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+def load_manifest(static_folder: str) -> dict:
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    if not os.path.isfile(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def init_assets(app):
+    """
+    Pasang manifest hasil `scripts/build_static.py`: url_for('static', filename=...)
+    otomatis menghasilkan URL ber-hash, dan file di dist/ disajikan dengan
+    varian .br/.gz plus Cache-Control jangka panjang.
+    """
+    manifest = load_manifest(app.static_folder)
+    app.extensions["static_manifest"] = manifest
+
+    @app.url_defaults
+    def hashed_static_url(endpoint, values):
+        if endpoint == "static" and values.get("filename") in manifest:
+            values["filename"] = manifest[values["filename"]]
+
+    def serve_static(filename):
+        hashed = filename.startswith(f"{DIST_DIR}/")
+        resp = None
+        if hashed:
+            offered = [e for e in available_encodings()
+                       if os.path.isfile(os.path.join(app.static_folder, filename + ENCODING_SUFFIX[e]))]
+            encoding = negotiate_encoding(offered) if offered else None
+            if encoding:
+                mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+                resp = send_from_directory(app.static_folder, filename + ENCODING_SUFFIX[encoding], mimetype=mimetype)
+                resp.headers["Content-Encoding"] = encoding
+            resp = resp or app.send_static_file(filename)
+            resp.vary.add("Accept-Encoding")
+            resp.cache_control.no_cache = None
+            resp.cache_control.public = True
+            resp.cache_control.max_age = IMMUTABLE_MAX_AGE
+            resp.cache_control.immutable = True
+            return resp
+        return app.send_static_file(filename)
+
+    app.view_functions["static"] = serve_static
@@ -0,0 +1,293 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+_MISSING = object()
+
+class TTLCache:
+    """
+    LRU cache terbatas dengan TTL per entry, aman dipakai banyak thread.
+    Key berupa tuple; entry yang kedaluwarsa dibuang saat dibaca.
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 60.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self._versions = {}
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key, default=None):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                self.expirations += 1
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl: float = None):
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def delete_prefix(self, prefix: tuple):
+        # Remove every key whose leading elements equal `prefix`
+        n = len(prefix)
+        with self._lock:
+            for key in [k for k in self._data if k[:n] == prefix]:
+                del self._data[key]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def version(self, name: str) -> tuple:
+        # (counter, unix time of last bump); counters are never evicted
+        with self._lock:
+            return self._versions.get(name, (0, None))
+
+    def bump(self, name: str) -> tuple:
+        with self._lock:
+            counter, _ = self._versions.get(name, (0, None))
+            self._versions[name] = (counter + 1, time.time())
+            return self._versions[name]
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+def _encode_key(key: tuple) -> str:
+    return json.dumps(key, separators=(",", ":"), default=str)
+
+def _decode_key(raw) -> tuple:
+    value = json.loads(raw)
+    return tuple(_decode_key_part(p) for p in value)
+
+def _decode_key_part(part):
+    # JSON turns tuples into lists; turn them back so keys compare equal
+    if isinstance(part, list):
+        return tuple(_decode_key_part(p) for p in part)
+    return part
+
+def _glob_escape(text: str) -> str:
+    return "".join("\\" + c if c in "*?[]\\" else c for c in text)
+
+class RedisCache:
+    """
+    Cache bersama di server Redis (atau apa pun yang berbicara protokol Redis).
+    Value disimpan sebagai JSON dengan TTL; error Redis dianggap miss supaya
+    request tetap jalan walau cache mati.
+    """
+
+    def __init__(self, url: str, namespace: str, ttl: float = 60.0):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL uses Redis but the 'redis' package is not installed")
+        self._redis_error = redis.RedisError
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def _key(self, key: tuple) -> str:
+        return f"{self.namespace}:{_encode_key(key)}"
+
+    def get(self, key, default=None):
+        try:
+            raw = self.client.get(self._key(key))
+        except self._redis_error:
+            self.errors += 1
+            raw = None
+        if raw is None:
+            self.misses += 1
+            return default
+        self.hits += 1
+        return json.loads(raw)
+
+    def set(self, key, value, ttl: float = None):
+        ttl_ms = int((self.ttl if ttl is None else ttl) * 1000)
+        try:
+            self.client.set(self._key(key), json.dumps(value, default=str), px=ttl_ms)
+        except self._redis_error:
+            self.errors += 1
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except self._redis_error:
+            self.errors += 1
+
+    def delete_prefix(self, prefix: tuple):
+        # "[a,b" matches every encoded key that starts with the parts a, b
+        pattern = _glob_escape(f"{self.namespace}:{_encode_key(prefix)[:-1]}") + "*"
+        self._unlink_matching(pattern)
+
+    def clear(self):
+        self._unlink_matching(_glob_escape(f"{self.namespace}:") + "*")
+
+    def _unlink_matching(self, pattern: str):
+        try:
+            batch = []
+            for name in self.client.scan_iter(match=pattern, count=500):
+                batch.append(name)
+                if len(batch) >= 500:
+                    self.client.unlink(*batch)
+                    batch = []
+            if batch:
+                self.client.unlink(*batch)
+        except self._redis_error:
+            self.errors += 1
+
+    def version(self, name: str) -> tuple:
+        try:
+            counter, bumped_at = self.client.hmget(f"{self.namespace}:version:{name}", "counter", "at")
+        except self._redis_error:
+            self.errors += 1
+            return (0, None)
+        return (int(counter or 0), float(bumped_at) if bumped_at else None)
+
+    def bump(self, name: str) -> tuple:
+        key = f"{self.namespace}:version:{name}"
+        now = time.time()
+        try:
+            pipe = self.client.pipeline()
+            pipe.hincrby(key, "counter", 1)
+            pipe.hset(key, "at", now)
+            counter, _ = pipe.execute()
+        except self._redis_error:
+            self.errors += 1
+            return (0, None)
+        return (int(counter), now)
+
+    def stats(self) -> dict:
+        return {"ttl": self.ttl, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+
+class TieredCache:
+    """
+    TTLCache lokal di depan RedisCache bersama. Setiap invalidasi dikirim lewat
+    pub/sub Redis agar cache lokal di semua worker dan node ikut dibersihkan.
+    """
+
+    def __init__(self, local: TTLCache, shared: RedisCache):
+        self.local = local
+        self.shared = shared
+        self.channel = f"{shared.namespace}:invalidate"
+        self._listener = None
+        self._listener_pid = None
+        self._listener_lock = threading.Lock()
+
+    def _ensure_listener(self):
+        # Threads do not survive fork, so (re)start the subscriber per process
+        if self._listener_pid == os.getpid():
+            return
+        with self._listener_lock:
+            if self._listener_pid == os.getpid():
+                return
+            try:
+                pubsub = self.shared.client.pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{self.channel: self._on_message})
+                self._listener = pubsub.run_in_thread(sleep_time=1.0, daemon=True)
+                self._listener_pid = os.getpid()
+            except self.shared._redis_error:
+                self.shared.errors += 1
+
+    def _on_message(self, message):
+        event = json.loads(message["data"])
+        op = event.get("op")
+        if op == "delete":
+            self.local.delete(_decode_key(event["key"]))
+        elif op == "delete_prefix":
+            self.local.delete_prefix(_decode_key(event["key"]))
+        elif op == "clear":
+            self.local.clear()
+
+    def _publish(self, op: str, key: tuple = None):
+        event = {"op": op}
+        if key is not None:
+            event["key"] = _encode_key(key)
+        try:
+            self.shared.client.publish(self.channel, json.dumps(event))
+        except self.shared._redis_error:
+            self.shared.errors += 1
+
+    def get(self, key, default=None):
+        self._ensure_listener()
+        value = self.local.get(key, _MISSING)
+        if value is not _MISSING:
+            return value
+        value = self.shared.get(key, _MISSING)
+        if value is _MISSING:
+            return default
+        self.local.set(key, value)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        self.local.set(key, value, ttl)
+        self.shared.set(key, value, ttl)
+
+    def delete(self, key):
+        self.local.delete(key)
+        self.shared.delete(key)
+        self._publish("delete", key)
+
+    def delete_prefix(self, prefix: tuple):
+        self.local.delete_prefix(prefix)
+        self.shared.delete_prefix(prefix)
+        self._publish("delete_prefix", prefix)
+
+    def clear(self):
+        self.local.clear()
+        self.shared.clear()
+        self._publish("clear")
+
+    def version(self, name: str) -> tuple:
+        return self.shared.version(name)
+
+    def bump(self, name: str) -> tuple:
+        return self.shared.bump(name)
+
+    def stats(self) -> dict:
+        return {"local": self.local.stats(), "shared": self.shared.stats()}
+
+def create_cache(url: str, namespace: str, maxsize: int = 1024, ttl: float = 60.0):
+    """
+    Buat cache sesuai `url`: kosong untuk cache in-memory per worker,
+    redis:// / rediss:// / unix:// untuk cache bersama antar worker.
+    """
+    local = TTLCache(maxsize=maxsize, ttl=ttl)
+    if not url:
+        return local
+    return TieredCache(local, RedisCache(url, namespace, ttl=ttl))
@@ -0,0 +1,68 @@
+import gzip
+from flask import request, current_app
+
+try:
+    import brotli
+except ImportError:  # brotli is optional; gzip is always available
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json",
+    "text/html",
+    "text/css",
+    "text/plain",
+    "application/javascript",
+    "text/javascript",
+    "image/svg+xml",
+}
+
+def available_encodings() -> list:
+    return ["br", "gzip"] if brotli is not None else ["gzip"]
+
+def negotiate_encoding(offered: list):
+    """Pick the best encoding from `offered` that the client accepts (by q-value), or None."""
+    accept = request.accept_encodings
+    best, best_q = None, 0
+    for enc in offered:
+        q = accept[enc]
+        if q > best_q:
+            best, best_q = enc, q
+    return best
+
+def compress(data: bytes, encoding: str, level: int) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=min(level, 11))
+    return gzip.compress(data, compresslevel=min(level, 9))
+
+def tag_etag(response, encoding: str):
+    # A strong ETag must differ per representation, so suffix it with the encoding
+    etag, weak = response.get_etag()
+    if etag and not weak and not etag.endswith(f"-{encoding}"):
+        response.set_etag(f"{etag}-{encoding}")
+
+def compress_response(response):
+    """after_request hook: gzip/brotli dynamic JSON/HTML bodies above COMPRESS_MIN_SIZE."""
+    if response.headers.get("Content-Encoding"):
+        tag_etag(response, response.headers["Content-Encoding"])
+        return response
+    if (
+        response.direct_passthrough
+        or request.endpoint == "static"
+        or response.status_code < 200
+        or response.status_code in (204, 206, 304)
+        or response.mimetype not in COMPRESSIBLE_TYPES
+    ):
+        return response
+
+    data = response.get_data()
+    if len(data) < current_app.config["COMPRESS_MIN_SIZE"]:
+        return response
+    encoding = negotiate_encoding(available_encodings())
+    if encoding is None:
+        return response
+
+    response.set_data(compress(data, encoding, current_app.config["COMPRESS_LEVEL"]))
+    response.headers["Content-Encoding"] = encoding
+    response.vary.add("Accept-Encoding")
+    tag_etag(response, encoding)
+    return response
@@ -0,0 +1,49 @@
+import contextvars
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_pool: ThreadPoolExecutor | None = None
+_pool_pid: int | None = None
+_pool_lock = threading.Lock()
+
+def _executor() -> ThreadPoolExecutor:
+    # Threads do not survive fork, so each worker process builds its own pool
+    global _pool, _pool_pid
+    if _pool_pid != os.getpid():
+        with _pool_lock:
+            if _pool_pid != os.getpid():
+                from flask import current_app
+                _pool = ThreadPoolExecutor(
+                    max_workers=current_app.config.get("FANOUT_WORKERS", 16),
+                    thread_name_prefix="fanout",
+                )
+                _pool_pid = os.getpid()
+    return _pool
+
+def parallel(*calls):
+    """
+    Jalankan beberapa fungsi tanpa argumen (mis. query Supabase yang saling
+    independen) bersamaan dan kembalikan hasilnya sesuai urutan. Fungsi pertama
+    berjalan di thread request, sisanya di thread pool terbatas bersama dengan
+    context request yang sama (session, g, client Supabase). Semua fungsi
+    ditunggu selesai sebelum return, dan exception pertama diteruskan.
+    """
+    if len(calls) <= 1:
+        return [call() for call in calls]
+
+    pool = _executor()
+    futures = [pool.submit(contextvars.copy_context().run, call) for call in calls[1:]]
+    results, error = [], None
+    try:
+        results.append(calls[0]())
+    except Exception as e:
+        error = e
+    for future in futures:
+        try:
+            results.append(future.result())
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return results
@@ -0,0 +1,53 @@
+from functools import wraps
+from datetime import datetime, timezone
+from hashlib import sha1
+from flask import request, current_app, make_response
+
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+def conditional(version_fn):
+    """
+    Tambahkan ETag/Last-Modified dan Cache-Control ke response GET, dan jawab
+    304 tanpa memanggil view (dan tanpa query ke Supabase) jika validator dari
+    browser/CDN masih cocok dengan `version_fn()`.
+
+    `version_fn` returns (version, last_modified_unix_ts_or_None). Cache-Control
+    comes from the `<BLUEPRINT>_CACHE_CONTROL` config key.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            version, last_modified = version_fn()
+            etag = sha1(f"{version}|{request.full_path}".encode()).hexdigest()
+            modified = datetime.fromtimestamp(int(last_modified), tz=timezone.utc) if last_modified else None
+            cache_control = current_app.config.get(f"{(request.blueprint or '').upper()}_CACHE_CONTROL") or DEFAULT_CACHE_CONTROL
+
+            matched = _not_modified(etag, modified)
+            if matched:
+                resp = make_response("", 304)
+                # Echo the representation the client validated (compress_response skips 304s)
+                etag = matched
+            else:
+                resp = make_response(f(*args, **kwargs))
+                if resp.status_code != 200:
+                    return resp
+            resp.set_etag(etag)
+            if modified:
+                resp.last_modified = modified
+            resp.headers["Cache-Control"] = cache_control
+            return resp
+        return wrapper
+    return decorator
+
+def _not_modified(etag: str, modified):
+    # Returns the ETag to send with a 304, or None when the view must run.
+    # If-None-Match wins over If-Modified-Since (RFC 9110 13.2.2)
+    if request.if_none_match:
+        # compress_response suffixes the ETag with the content encoding
+        for tag in (etag, f"{etag}-gzip", f"{etag}-br"):
+            if request.if_none_match.contains(tag):
+                return tag
+        return None
+    if modified and request.if_modified_since and modified <= request.if_modified_since:
+        return etag
+    return None
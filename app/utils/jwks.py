@@ -0,0 +1,108 @@
+import logging
+import hashlib
+import threading
+import time
+import httpx
+import jwt
+from ..extensions import upstream_http
+from .cache import TTLCache
+
+log = logging.getLogger(__name__)
+
+class JWKSCache:
+    """
+    Cache JWKS (public key penandatangan JWT) per proses dengan lookup per `kid`.
+    Key di-refresh di background sebelum kedaluwarsa; `kid` yang belum dikenal
+    memicu fetch ulang, dibatasi paling sering sekali per `min_refetch_interval`.
+    Jika server auth lambat atau mati, key lama tetap dipakai.
+    """
+
+    def __init__(self, url: str, ttl: float = 600.0, min_refetch_interval: float = 30.0, timeout: float = 5.0):
+        self.url = url
+        self.ttl = ttl
+        self.min_refetch_interval = min_refetch_interval
+        self.timeout = timeout
+        self._keys = {}
+        self._fetched_at = None
+        self._last_attempt = 0.0
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.fetches = 0
+        self.fetch_errors = 0
+
+    def get_signing_key(self, kid: str):
+        now = time.monotonic()
+        key = self._keys.get(kid)
+        if key is not None:
+            if now - self._fetched_at > self.ttl * 0.8:
+                self._refresh_in_background()
+            return key
+
+        # Unknown kid (or nothing fetched yet): fetch now, but never hammer the auth server
+        with self._lock:
+            key = self._keys.get(kid)
+            if key is None and time.monotonic() - self._last_attempt >= self.min_refetch_interval:
+                self._fetch()
+                key = self._keys.get(kid)
+        if key is None:
+            raise jwt.PyJWKClientError(f'Unable to find a signing key that matches: "{kid}"')
+        return key
+
+    def _refresh_in_background(self):
+        with self._lock:
+            if self._refreshing or time.monotonic() - self._last_attempt < self.min_refetch_interval:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            with self._lock:
+                self._fetch()
+        finally:
+            self._refreshing = False
+
+    def _fetch(self):
+        # Caller holds self._lock
+        self._last_attempt = time.monotonic()
+        self.fetches += 1
+        try:
+            # Shared keep-alive pool; the fetch shows up as an upstream span in the request trace
+            resp = upstream_http().get(self.url, timeout=self.timeout)
+            resp.raise_for_status()
+            jwk_set = jwt.PyJWKSet.from_dict(resp.json())
+        except (httpx.HTTPError, ValueError, jwt.PyJWKSetError) as e:
+            self.fetch_errors += 1
+            log.warning("Fetching JWKS failed", extra={"url": self.url, "error": str(e)})
+            return
+        self._keys = {key.key_id: key for key in jwk_set.keys if key.key_id}
+        self._fetched_at = time.monotonic()
+
+    def stats(self) -> dict:
+        age = time.monotonic() - self._fetched_at if self._fetched_at else None
+        return {"keys": len(self._keys), "age_seconds": age, "fetches": self.fetches, "fetch_errors": self.fetch_errors}
+
+class VerifiedTokenCache:
+    """
+    LRU berisi payload token yang signature-nya sudah diverifikasi, dengan key
+    hash SHA-256 token dan TTL sampai `exp` token, sehingga token yang sama
+    tidak perlu diverifikasi ulang secara kriptografis.
+    """
+
+    def __init__(self, maxsize: int = 4096):
+        self._cache = TTLCache(maxsize=maxsize, ttl=0)
+
+    @staticmethod
+    def _key(token: str) -> tuple:
+        return (hashlib.sha256(token.encode()).hexdigest(),)
+
+    def get(self, token: str):
+        return self._cache.get(self._key(token))
+
+    def put(self, token: str, payload: dict):
+        ttl = payload.get("exp", 0) - time.time()
+        if ttl > 0:
+            self._cache.set(self._key(token), payload, ttl=ttl)
+
+    def stats(self) -> dict:
+        return self._cache.stats()
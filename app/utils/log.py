@@ -0,0 +1,111 @@
+import atexit
+import copy
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+
+# Attributes every LogRecord has; anything else came in through `extra=` and is emitted as a field
+_RECORD_ATTRS = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "taskName"}
+
+class JsonFormatter(logging.Formatter):
+    """Satu objek JSON per baris: ts, level, logger, msg, field `extra`, dan exception jika ada."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in record.__dict__.items():
+            if key not in _RECORD_ATTRS:
+                entry[key] = value
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+class DebugSampler(logging.Filter):
+    # Keep only a fraction of DEBUG records; INFO and above always pass
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        return record.levelno > logging.DEBUG or self.rate >= 1 or random.random() < self.rate
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler yang tidak pernah memblok request: jika antrian penuh, record dibuang dan dihitung."""
+
+    def __init__(self, q: queue.Queue, output: logging.Handler):
+        super().__init__(q)
+        self.output = output
+        self.dropped = 0
+        self._listener = None
+        self._listener_pid = None
+        self._start_listener()
+
+    def _start_listener(self):
+        # Threads do not survive fork, so (re)start the writer per process
+        self._listener = logging.handlers.QueueListener(self.queue, self.output, respect_handler_level=False)
+        self._listener.start()
+        self._listener_pid = os.getpid()
+        atexit.register(self._listener.stop)
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Render message args and traceback now; keep `extra` fields for the JSON writer
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        if self._listener_pid != os.getpid():
+            self._start_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+def parse_levels(spec: str) -> dict:
+    # "app.routes.orders=DEBUG, app.services=WARNING" -> {"app.routes.orders": "DEBUG", ...}
+    levels = {}
+    for part in (spec or "").split(","):
+        name, sep, level = part.partition("=")
+        if sep and name.strip() and level.strip():
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+def init_logging(app):
+    """
+    Pasang logging terstruktur: record dari logger `app.*` (termasuk app.logger
+    milik Flask, yang bernama "app") masuk ke antrian terbatas lalu ditulis
+    sebagai JSON lines oleh thread latar belakang, jadi I/O stdout tidak pernah
+    menahan worker. Level per modul diatur lewat LOG_LEVELS, DEBUG di-sample
+    sesuai LOG_DEBUG_SAMPLE_RATE.
+    """
+    config = app.config
+    root = logging.getLogger("app")
+    root.setLevel(config["LOG_LEVEL"].upper())
+    for name, level in parse_levels(config["LOG_LEVELS"]).items():
+        logging.getLogger(name).setLevel(level)
+
+    if not any(isinstance(h, DroppingQueueHandler) for h in root.handlers):
+        output = logging.StreamHandler(sys.stdout)
+        output.setFormatter(JsonFormatter())
+        handler = DroppingQueueHandler(queue.Queue(config["LOG_QUEUE_SIZE"]), output)
+        handler.addFilter(DebugSampler(config["LOG_DEBUG_SAMPLE_RATE"]))
+        root.addHandler(handler)
+        root.propagate = False
+
+def log_stats() -> dict:
+    handler = next((h for h in logging.getLogger("app").handlers if isinstance(h, DroppingQueueHandler)), None)
+    if handler is None:
+        return {"enabled": False}
+    return {"enabled": True, "queued": handler.queue.qsize(), "dropped": handler.dropped}
@@ -0,0 +1,87 @@
+from functools import wraps
+from flask import request, session, current_app, make_response, g
+from .cache import TTLCache
+from .compression import available_encodings, compress, negotiate_encoding
+
+class PageCache:
+    """
+    Cache HTML hasil render untuk pengunjung anonim, per route + argumen +
+    versi katalog. Memori dibatasi oleh jumlah entry x ukuran entry maksimum;
+    halaman yang lebih besar tidak di-cache. Versi gzip (dan br jika brotli
+    terpasang) disimpan sekalian.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 60.0, max_entry_bytes: int = 256 * 1024):
+        self.entries = TTLCache(maxsize=maxsize, ttl=ttl)
+        self.max_entry_bytes = max_entry_bytes
+        self.skipped = 0
+
+    def get(self, key):
+        return self.entries.get(key)
+
+    def put(self, key, body: bytes, content_type: str):
+        if len(body) > self.max_entry_bytes:
+            self.skipped += 1
+            return
+        encoded = {enc: compress(body, enc, 6) for enc in available_encodings()}
+        self.entries.set(key, (body, encoded, content_type))
+
+    def stats(self) -> dict:
+        return {**self.entries.stats(), "max_entry_bytes": self.max_entry_bytes, "skipped_too_large": self.skipped}
+
+page_cache = None
+
+def _page_cache() -> PageCache:
+    global page_cache
+    if page_cache is None:
+        cfg = current_app.config
+        page_cache = PageCache(cfg["PAGE_CACHE_SIZE"], cfg["PAGE_CACHE_TTL"], cfg["PAGE_CACHE_MAX_ENTRY_BYTES"])
+    return page_cache
+
+def page_cache_stats() -> dict:
+    return page_cache.stats() if page_cache is not None else {"size": 0}
+
+def skip_page_cache():
+    # Call from a cached view to serve this render without storing it (e.g. not-found pages)
+    g.skip_page_cache = True
+
+def cached_page(version_fn, params: tuple = ()):
+    """
+    Sajikan HTML yang sudah dirender untuk request anonim; request dengan
+    session user selalu dirender ulang. Key hanya memakai query parameter
+    yang dikenal route (`params`), jadi parameter lain tidak membuat entry
+    baru. `version_fn()` returns (version, _) and is part of the key, so
+    catalog writes retire old pages.
+    """
+    def decorator(f):
+        @wraps(f)
+        def wrapper(*args, **kwargs):
+            if session.get("user_id") or current_app.config["PAGE_CACHE_SIZE"] <= 0:
+                return f(*args, **kwargs)
+
+            cache = _page_cache()
+            known = tuple((name, request.args.get(name)) for name in params if request.args.get(name))
+            key = (request.endpoint, tuple(sorted(kwargs.items())), known, version_fn()[0])
+            entry = cache.get(key)
+            if entry is None:
+                resp = make_response(f(*args, **kwargs))
+                if resp.status_code != 200 or resp.direct_passthrough or g.pop("skip_page_cache", False):
+                    return resp
+                cache.put(key, resp.get_data(), resp.content_type)
+                # Hits pick a representation by Accept-Encoding, so every response of this URL varies on it
+                resp.vary.add("Accept-Encoding")
+                return resp
+
+            body, encoded, content_type = entry
+            # The client's pick by q-value (gzip;q=0 means no gzip), or the plain body
+            encoding = negotiate_encoding(list(encoded))
+            if encoding is not None:
+                resp = make_response(encoded[encoding])
+                resp.headers["Content-Encoding"] = encoding
+            else:
+                resp = make_response(body)
+            resp.content_type = content_type
+            resp.vary.add("Accept-Encoding")
+            return resp
+        return wrapper
+    return decorator
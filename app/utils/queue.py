@@ -0,0 +1,221 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+
+class SQLiteQueue:
+    """
+    Antrian event tahan restart di satu file SQLite (mode WAL), aman dipakai
+    beberapa thread dan proses di satu host. Event dengan `dedupe_key` yang
+    sama diabaikan selama `dedupe_ttl` detik. Event yang sudah di-claim tapi
+    tidak di-ack akan muncul lagi setelah lease-nya habis (at-least-once).
+    """
+
+    def __init__(self, path: str, dedupe_ttl: float = 86400.0):
+        self.path = path
+        self.dedupe_ttl = dedupe_ttl
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        db = self._db()
+        db.execute("pragma journal_mode=wal")
+        db.execute(
+            "create table if not exists events ("
+            " id integer primary key autoincrement,"
+            " dedupe_key text not null unique,"
+            " payload text not null,"
+            " enqueued_at real not null,"
+            " available_at real not null,"
+            " attempts integer not null default 0,"
+            " done_at real,"
+            " failed integer not null default 0)"
+        )
+        db.execute("create index if not exists idx_events_ready on events(available_at) where done_at is null")
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("pragma synchronous=normal")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def put(self, dedupe_key: str, payload: dict) -> bool:
+        """Simpan event; False jika event yang sama sudah pernah masuk."""
+        now = time.time()
+        cur = self._db().execute(
+            "insert or ignore into events (dedupe_key, payload, enqueued_at, available_at) values (?, ?, ?, ?)",
+            (dedupe_key, json.dumps(payload), now, now),
+        )
+        return cur.rowcount == 1
+
+    def claim(self, limit: int, lease: float) -> list:
+        """Ambil sampai `limit` event yang siap; masing-masing tersembunyi selama `lease` detik."""
+        now = time.time()
+        db = self._db()
+        db.execute("begin immediate")
+        try:
+            rows = db.execute(
+                "select id, payload, enqueued_at, attempts from events"
+                " where done_at is null and available_at <= ? order by id limit ?",
+                (now, limit),
+            ).fetchall()
+            if rows:
+                db.executemany(
+                    "update events set available_at = ?, attempts = attempts + 1 where id = ?",
+                    [(now + lease, row[0]) for row in rows],
+                )
+            db.execute("commit")
+        except BaseException:
+            db.execute("rollback")
+            raise
+        return [
+            {"id": id_, "payload": json.loads(payload), "enqueued_at": enqueued_at, "attempts": attempts + 1}
+            for id_, payload, enqueued_at, attempts in rows
+        ]
+
+    def ack(self, ids: list):
+        now = time.time()
+        self._db().executemany("update events set done_at = ? where id = ?", [(now, id_) for id_ in ids])
+
+    def retry(self, event: dict, delay: float):
+        self._db().execute("update events set available_at = ? where id = ?", (time.time() + delay, event["id"]))
+
+    def fail(self, event: dict):
+        # Dead letter: kept (with failed = 1) for inspection until purged
+        self._db().execute("update events set done_at = ?, failed = 1 where id = ?", (time.time(), event["id"]))
+
+    def purge(self):
+        # Finished events only exist to dedupe late retries
+        self._db().execute("delete from events where done_at is not null and done_at < ?", (time.time() - self.dedupe_ttl,))
+
+    def stats(self) -> dict:
+        now = time.time()
+        depth, ready, oldest = self._db().execute(
+            "select count(*), sum(available_at <= ?), min(enqueued_at) from events where done_at is null", (now,)
+        ).fetchone()
+        failed = self._db().execute("select count(*) from events where failed = 1").fetchone()[0]
+        return {
+            "backend": "sqlite",
+            "depth": depth,
+            "ready": ready or 0,
+            "oldest_age_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "dead": failed,
+        }
+
+# Atomically pick due events and push them out by the lease, so two workers never claim the same one
+_CLAIM_SCRIPT = """
+local ids = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', ARGV[1], 'LIMIT', 0, ARGV[2])
+for _, id in ipairs(ids) do
+  redis.call('ZADD', KEYS[1], ARGV[3], id)
+end
+return ids
+"""
+
+class RedisQueue:
+    """
+    Antrian event di Redis: sorted set id -> waktu siap diproses, hash id ->
+    event, dan key dedupe dengan TTL. Semantik sama dengan SQLiteQueue,
+    tetapi bisa dipakai bersama oleh worker di banyak host.
+    """
+
+    def __init__(self, url: str, namespace: str, dedupe_ttl: float = 86400.0):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("WEBHOOK_QUEUE_URL uses Redis but the 'redis' package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self.dedupe_ttl = dedupe_ttl
+        self._claim = self.client.register_script(_CLAIM_SCRIPT)
+        self._pending = f"{namespace}:pending"
+        self._events = f"{namespace}:events"
+        self._dead = f"{namespace}:dead"
+
+    def put(self, dedupe_key: str, payload: dict) -> bool:
+        if not self.client.set(f"{self.namespace}:dedupe:{dedupe_key}", 1, nx=True, ex=int(self.dedupe_ttl)):
+            return False
+        now = time.time()
+        id_ = self.client.incr(f"{self.namespace}:seq")
+        event = {"payload": payload, "enqueued_at": now, "attempts": 0}
+        pipe = self.client.pipeline()
+        pipe.hset(self._events, id_, json.dumps(event))
+        pipe.zadd(self._pending, {id_: now})
+        pipe.execute()
+        return True
+
+    def claim(self, limit: int, lease: float) -> list:
+        now = time.time()
+        ids = self._claim(keys=[self._pending], args=[now, limit, now + lease])
+        if not ids:
+            return []
+        events = []
+        for id_, raw in zip(ids, self.client.hmget(self._events, ids)):
+            if raw is None:
+                continue
+            event = json.loads(raw)
+            event["id"] = int(id_)
+            event["attempts"] += 1
+            events.append(event)
+        if events:
+            self.client.hset(self._events, mapping={e["id"]: json.dumps(_stored(e)) for e in events})
+        return events
+
+    def ack(self, ids: list):
+        if not ids:
+            return
+        pipe = self.client.pipeline()
+        pipe.zrem(self._pending, *ids)
+        pipe.hdel(self._events, *ids)
+        pipe.execute()
+
+    def retry(self, event: dict, delay: float):
+        self.client.zadd(self._pending, {event["id"]: time.time() + delay})
+
+    def fail(self, event: dict):
+        pipe = self.client.pipeline()
+        pipe.zrem(self._pending, event["id"])
+        pipe.hdel(self._events, event["id"])
+        pipe.lpush(self._dead, json.dumps(_stored(event)))
+        pipe.ltrim(self._dead, 0, 999)
+        pipe.execute()
+
+    def purge(self):
+        # Dedupe keys expire on their own
+        pass
+
+    def stats(self) -> dict:
+        now = time.time()
+        pipe = self.client.pipeline()
+        pipe.zcard(self._pending)
+        pipe.zcount(self._pending, "-inf", now)
+        pipe.zrange(self._pending, 0, 0)
+        pipe.llen(self._dead)
+        depth, ready, first, dead = pipe.execute()
+        oldest = None
+        if first:
+            raw = self.client.hget(self._events, first[0])
+            oldest = json.loads(raw)["enqueued_at"] if raw else None
+        return {
+            "backend": "redis",
+            "depth": depth,
+            "ready": ready,
+            "oldest_age_seconds": round(now - oldest, 3) if oldest else 0.0,
+            "dead": dead,
+        }
+
+def _stored(event: dict) -> dict:
+    return {"payload": event["payload"], "enqueued_at": event["enqueued_at"], "attempts": event["attempts"]}
+
+def create_queue(url: str, namespace: str, default_path: str, dedupe_ttl: float = 86400.0):
+    """
+    Buat antrian sesuai `url`: kosong untuk file SQLite di `default_path`,
+    sqlite:///path/ke/file.db, atau redis:// / rediss:// / unix:// untuk Redis.
+    """
+    if not url:
+        return SQLiteQueue(default_path, dedupe_ttl)
+    if url.startswith("sqlite:///"):
+        return SQLiteQueue(url[len("sqlite:///"):], dedupe_ttl)
+    return RedisQueue(url, namespace, dedupe_ttl)
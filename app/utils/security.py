@@ -1,52 +1,68 @@
 from functools import wraps
-from flask import session, jsonify, current_app
+from flask import session, jsonify, current_app, g, request
+from .cache import TTLCache
+from .jwks import JWKSCache, VerifiedTokenCache
+from ..services.auth_svc import AuthServerUnavailable, fetch_auth_user, refresh_access_token
+import hashlib
+import logging
+import threading
 import jwt
 import time
 
+log = logging.getLogger(__name__)
+
+_jwks: JWKSCache | None = None
+_verified: VerifiedTokenCache | None = None
+_init_lock = threading.Lock()
+
+def _jwt_caches() -> tuple:
+    # Process-wide JWKS + verified-token caches, built on first use
+    global _jwks, _verified
+    if _jwks is None:
+        with _init_lock:
+            if _jwks is None:
+                config = current_app.config
+                _verified = VerifiedTokenCache(maxsize=config["JWT_CACHE_SIZE"])
+                _jwks = JWKSCache(
+                    f"{config['SUPABASE_URL'].rstrip('/')}/auth/v1/keys",
+                    ttl=config["JWKS_CACHE_TTL"],
+                    min_refetch_interval=config["JWKS_MIN_REFETCH_INTERVAL"],
+                )
+    return _jwks, _verified
+
+def jwt_cache_stats() -> dict:
+    jwks, verified = _jwt_caches()
+    return {"jwks": jwks.stats(), "verified_tokens": verified.stats()}
+
 def verify_supabase_jwt(access_token: str) -> dict:
     """
     Verifikasi signature & claims JWT yang dikeluarkan Supabase.
     Return payload (dict) jika valid, raise exception jika invalid/expired.
+    Token yang sudah terverifikasi di-cache sampai `exp`.
     """
-    # Decode header to check algorithm
+    jwks, verified = _jwt_caches()
+    payload = verified.get(access_token)
+    if payload is not None:
+        return payload
+
     header_data = jwt.get_unverified_header(access_token)
-    
-    # For Supabase, access tokens can be verified in multiple ways
-    # First, try with anon key if using HS256
-    if header_data.get('alg') == 'HS256':
-        anon_key = current_app.config['SUPABASE_ANON_KEY']
-        
-        try:
-            issuer = f"{current_app.config['SUPABASE_URL'].rstrip('/')}/auth/v1"
-            
+    issuer = f"{current_app.config['SUPABASE_URL'].rstrip('/')}/auth/v1"
+    if header_data.get("alg") == "HS256":
+        secret = current_app.config.get("SUPABASE_JWT_SECRET")
+        if secret:
             payload = jwt.decode(
                 access_token,
-                anon_key,
+                secret,
                 algorithms=["HS256"],
                 audience="authenticated",
                 issuer=issuer,
                 options={"require": ["exp", "iat", "iss", "sub"]},
             )
-            return payload
-        except jwt.InvalidSignatureError:
-            # If signature verification fails, decode without verification to check expiration
-            unverified_payload = jwt.decode(access_token, options={"verify_signature": False})
-            
-            # Check if token is expired
-            if unverified_payload.get('exp', 0) < time.time():
-                raise Exception("JWT token has expired")
-                
-            # If not expired, trust the token (since it came from Supabase directly)
-            return unverified_payload
+        else:
+            payload = _verify_with_auth_server(access_token, issuer)
     else:
-        # For RS256, use JWKS approach
-        from jwt import PyJWKClient
-        
-        jwks_url = f"{current_app.config['SUPABASE_URL'].rstrip('/')}/auth/v1/keys"
-        jwks_client = PyJWKClient(jwks_url)
-        
-        signing_key = jwks_client.get_signing_key_from_jwt(access_token)
-        issuer = f"{current_app.config['SUPABASE_URL'].rstrip('/')}/auth/v1"
+        # For RS256, use the cached JWKS (looked up by kid)
+        signing_key = jwks.get_signing_key(header_data.get("kid"))
         payload = jwt.decode(
             access_token,
             signing_key.key,
@@ -55,14 +71,140 @@ def verify_supabase_jwt(access_token: str) -> dict:
             issuer=issuer,
             options={"require": ["exp", "iat", "iss", "sub"]},
         )
-        return payload
+    verified.put(access_token, payload)
+    return payload
+
+def _verify_with_auth_server(access_token: str, issuer: str) -> dict:
+    # Without SUPABASE_JWT_SECRET the HS256 signature cannot be checked here, so let
+    # GoTrue validate the token once; the caller caches the result until exp
+    user = fetch_auth_user(access_token)
+    if not user:
+        raise jwt.InvalidTokenError("Token rejected by Supabase Auth")
+    payload = jwt.decode(
+        access_token,
+        options={"verify_signature": False, "require": ["exp", "iat", "iss", "sub"]},
+        audience="authenticated",
+        issuer=issuer,
+    )
+    if payload["sub"] != user.get("id"):
+        raise jwt.InvalidTokenError("Token subject does not match Supabase Auth user")
+    return payload
+
+_AUTH_SESSION_KEYS = ("access_token", "refresh_token", "user_id", "user_email", "role")
+
+# One refresh per refresh token at a time in this process; parallel requests of the
+# same session wait for it and reuse the result (Supabase rotates refresh tokens)
+_refresh_locks = {}
+_refresh_locks_guard = threading.Lock()
+_refreshed = TTLCache(maxsize=4096, ttl=60)
+
+def authenticate_request():
+    """
+    before_request: verifikasi access token di session secara lokal (key JWKS
+    dan token terverifikasi di-cache) dan simpan claims di g.auth_claims.
+    Token yang akan kedaluwarsa dalam JWT_REFRESH_MARGIN detik di-refresh
+    lewat refresh token; token expired tanpa refresh token langsung ditolak
+    tanpa round trip ke Supabase dan session-nya dibersihkan. Jika Supabase
+    Auth tidak bisa dihubungi, session dibiarkan dan require_auth menjawab 503.
+    """
+    g.auth_claims = None
+    if request.endpoint == "static":
+        return
+    token = session.get("access_token")
+    if not token or not session.get("user_id"):
+        return
+    try:
+        # Cheap unverified peek at exp; the signature is checked below
+        exp = jwt.decode(token, options={"verify_signature": False}).get("exp", 0)
+    except jwt.DecodeError:
+        exp = 0
+
+    now = time.time()
+    try:
+        if exp - now < current_app.config["JWT_REFRESH_MARGIN"] and session.get("refresh_token"):
+            try:
+                token = _refresh_session_token() or (token if exp > now else None)
+            except AuthServerUnavailable:
+                if exp <= now:
+                    raise
+                # Still valid for a little while: use it, the next request retries the refresh
+
+        elif exp <= now:
+            token = None
+
+        claims = None
+        if token:
+            try:
+                claims = verify_supabase_jwt(token)
+            except AuthServerUnavailable:
+                raise
+            except Exception:
+                claims = None
+    except AuthServerUnavailable as e:
+        # Not a verdict on the token: keep the session so the user is not logged out by an outage
+        log.warning("Supabase Auth unavailable, request left unauthenticated", extra={"error": str(e)})
+        g.auth_unavailable = True
+        return
+    if claims is None or claims.get("sub") != session["user_id"]:
+        for key in _AUTH_SESSION_KEYS:
+            session.pop(key, None)
+        return
+    g.auth_claims = claims
+
+def _refresh_session_token():
+    old = session["refresh_token"]
+    key = (hashlib.sha256(old.encode()).hexdigest(),)
+    with _refresh_locks_guard:
+        lock = _refresh_locks.setdefault(key, threading.Lock())
+    with lock:
+        refreshed = _refreshed.get(key)
+        if refreshed is None:
+            refreshed = refresh_access_token(old) or _refreshed_elsewhere(old)
+            if refreshed and refreshed.get("access_token"):
+                _refreshed.set(key, refreshed)
+        with _refresh_locks_guard:
+            _refresh_locks.pop(key, None)
+    if not refreshed or not refreshed.get("access_token"):
+        return None
+    session["access_token"] = refreshed["access_token"]
+    session["refresh_token"] = refreshed.get("refresh_token") or old
+    # Drop clients built with the old token; attach_user_token runs after this hook
+    g.pop("_supabase_client", None)
+    g.pop("_async_supabase_client", None)
+    return refreshed["access_token"]
+
+def _refreshed_elsewhere(old_refresh_token: str):
+    # A request on another worker may have rotated this refresh token a moment ago and
+    # saved the new pair to the server-side session store: adopt it instead of logging out
+    store = getattr(current_app.session_interface, "store", None)
+    sid = getattr(session, "sid", None)
+    if store is None or sid is None:
+        return None
+    stored = store.get(sid) or {}
+    if stored.get("refresh_token") not in (None, old_refresh_token) and stored.get("access_token"):
+        return {"access_token": stored["access_token"], "refresh_token": stored["refresh_token"]}
+    return None
+
+def auth_claims() -> dict | None:
+    # Verified JWT claims of the current request (set by authenticate_request)
+    return g.get("auth_claims")
+
+def claims_role(claims: dict) -> str | None:
+    # App role lives in app_metadata; the top-level "role" claim is the Postgres role
+    return (claims.get("app_metadata") or {}).get("role")
+
+def _not_authenticated():
+    if g.get("auth_unavailable"):
+        return jsonify({"success": False, "data": None,
+                        "error": {"code": "AUTH_UNAVAILABLE", "message": "Authentication service unavailable, please retry"}}), 503
+    return jsonify({"success": False, "data": None,
+                    "error": {"code": "UNAUTHORIZED", "message": "Login required"}}), 401
 
 def require_auth(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
-        if not session.get("user_id") or not session.get("access_token"):
-            return jsonify({"success": False, "data": None,
-                            "error": {"code": "UNAUTHORIZED", "message": "Login required"}}), 401
+        if auth_claims() is None:
+            return _not_authenticated()
         return f(*args, **kwargs)
     return wrapper
 
@@ -70,15 +212,14 @@ def require_admin(f):
     @wraps(f)
     def wrapper(*args, **kwargs):
         # First check if user is authenticated
-        if not session.get("user_id") or not session.get("access_token"):
-            return jsonify({"success": False, "data": None,
-                            "error": {"code": "UNAUTHORIZED", "message": "Login required"}}), 401
+        claims = auth_claims()
+        if claims is None:
+            return _not_authenticated()
         
-        # Check if user has admin role
-        user_role = session.get("role")
-        if user_role != "admin":
+        # Check the admin role on the verified token, not the session cookie
+        if claims_role(claims) != "admin":
             return jsonify({"success": False, "data": None,
                             "error": {"code": "FORBIDDEN", "message": "Admin access required"}}), 403
         
         return f(*args, **kwargs)
-    return wrapper
\ No newline at end of file
+    return wrapper
@@ -0,0 +1,209 @@
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+from flask.sessions import SecureCookieSession, SessionInterface
+from .cache import TTLCache
+
+# A new value here means a login or a switch of user; the session id is rotated then.
+# Token refreshes keep the id, so parallel requests carrying the old cookie still find the session
+IDENTITY_KEY = "user_id"
+
+class ServerSideSession(SecureCookieSession):
+    # Same modified/accessed tracking as Flask's cookie session, plus the store id
+    def __init__(self, initial=None, sid: str = None, new: bool = False):
+        super().__init__(initial)
+        self.sid = sid
+        self.new = new
+        self.identity = self.get(IDENTITY_KEY)
+
+class MemorySessionStore:
+    """Session di memori proses (LRU + TTL); hanya untuk development / satu worker."""
+
+    def __init__(self, maxsize: int = 10000):
+        self._cache = TTLCache(maxsize=maxsize, ttl=0)
+
+    def get(self, sid: str):
+        return self._cache.get((sid,))
+
+    def set(self, sid: str, data: dict, ttl: float):
+        self._cache.set((sid,), data, ttl=ttl)
+
+    def delete(self, sid: str):
+        self._cache.delete((sid,))
+
+    def touch_many(self, sids: list, ttl: float):
+        for sid in sids:
+            data = self._cache.get((sid,))
+            if data is not None:
+                self._cache.set((sid,), data, ttl=ttl)
+
+class SQLiteSessionStore:
+    """Session di file SQLite (mode WAL), dipakai bersama oleh semua worker di satu host."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._local = threading.local()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        db = self._db()
+        db.execute("pragma journal_mode=wal")
+        db.execute("create table if not exists sessions (sid text primary key, data text not null, expires_at real not null)")
+        db.execute("create index if not exists idx_sessions_expires on sessions(expires_at)")
+
+    def _db(self) -> sqlite3.Connection:
+        # sqlite3 connections must not be shared between threads
+        db = getattr(self._local, "db", None)
+        if db is None or self._local.pid != os.getpid():
+            db = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            db.execute("pragma synchronous=normal")
+            self._local.db, self._local.pid = db, os.getpid()
+        return db
+
+    def get(self, sid: str):
+        row = self._db().execute("select data from sessions where sid = ? and expires_at > ?", (sid, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def set(self, sid: str, data: dict, ttl: float):
+        self._db().execute(
+            "insert or replace into sessions (sid, data, expires_at) values (?, ?, ?)",
+            (sid, json.dumps(data), time.time() + ttl),
+        )
+
+    def delete(self, sid: str):
+        self._db().execute("delete from sessions where sid = ?", (sid,))
+
+    def touch_many(self, sids: list, ttl: float):
+        now = time.time()
+        db = self._db()
+        db.execute("begin")
+        try:
+            db.executemany("update sessions set expires_at = ? where sid = ?", [(now + ttl, sid) for sid in sids])
+            db.execute("delete from sessions where expires_at <= ?", (now,))
+            db.execute("commit")
+        except BaseException:
+            db.execute("rollback")
+            raise
+
+class RedisSessionStore:
+    """Session di Redis (atau server lain yang berbicara protokol Redis) dengan TTL native."""
+
+    def __init__(self, url: str, namespace: str = "session"):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("SESSION_STORE_URL uses Redis but the 'redis' package is not installed")
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+
+    def _key(self, sid: str) -> str:
+        return f"{self.namespace}:{sid}"
+
+    def get(self, sid: str):
+        raw = self.client.get(self._key(sid))
+        return json.loads(raw) if raw is not None else None
+
+    def set(self, sid: str, data: dict, ttl: float):
+        self.client.set(self._key(sid), json.dumps(data), px=int(ttl * 1000))
+
+    def delete(self, sid: str):
+        self.client.delete(self._key(sid))
+
+    def touch_many(self, sids: list, ttl: float):
+        pipe = self.client.pipeline(transaction=False)
+        for sid in sids:
+            pipe.pexpire(self._key(sid), int(ttl * 1000))
+        pipe.execute()
+
+class ServerSessionInterface(SessionInterface):
+    """
+    Session Flask yang disimpan di server: cookie hanya berisi session id acak,
+    sedangkan isi session (token Supabase, user id, role, email) ada di store.
+    Expiry bergeser setiap kali session dipakai; perpanjangan untuk session
+    yang tidak berubah dikumpulkan dan ditulis sekaligus paling sering sekali
+    per `touch_interval` detik. Session id diganti setiap kali user_id berubah
+    (login, ganti user), tidak saat access token di-refresh.
+    """
+
+    def __init__(self, store, lifetime: float, touch_interval: float = 60.0):
+        self.store = store
+        self.lifetime = lifetime
+        self.touch_interval = touch_interval
+        self._touched = {}          # sid -> last time its expiry was extended
+        self._pending = set()       # sids waiting for the next batched touch
+        self._last_flush = time.monotonic()
+        self._lock = threading.Lock()
+
+    def open_session(self, app, request):
+        sid = request.cookies.get(self.get_cookie_name(app))
+        if sid:
+            data = self.store.get(sid)
+            if data is not None:
+                return ServerSideSession(data, sid=sid)
+        # Unknown or missing id: start fresh with a new random id (never adopt a client-chosen one)
+        return ServerSideSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if session.accessed:
+            response.vary.add("Cookie")
+
+        if not session:
+            if not session.new and session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if session.modified:
+            if not session.new and session.get(IDENTITY_KEY) != session.identity:
+                # Session fixation: a pre-existing id never carries over into a login
+                self.store.delete(session.sid)
+                session.sid = secrets.token_urlsafe(32)
+            self.store.set(session.sid, dict(session), self.lifetime)
+            self._touched[session.sid] = time.monotonic()
+        elif not self._touch(session.sid):
+            return
+
+        response.set_cookie(
+            name,
+            session.sid,
+            max_age=int(self.lifetime),
+            httponly=self.get_cookie_httponly(app),
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+            domain=domain,
+            path=path,
+        )
+
+    def _touch(self, sid: str) -> bool:
+        # True when this request should also slide the cookie's own expiry
+        now = time.monotonic()
+        with self._lock:
+            if now - self._touched.get(sid, 0) < self.touch_interval:
+                return False
+            self._touched[sid] = now
+            self._pending.add(sid)
+            if now - self._last_flush < self.touch_interval:
+                return True
+            batch, self._pending = list(self._pending), set()
+            self._last_flush = now
+            if len(self._touched) > 100000:
+                self._touched = {s: t for s, t in self._touched.items() if now - t < self.touch_interval}
+        self.store.touch_many(batch, self.lifetime)
+        return True
+
+def create_session_interface(url: str, lifetime: float, touch_interval: float = 60.0):
+    """
+    Buat session interface sesuai `url`: memory:// untuk LRU di memori,
+    sqlite:///path/ke/sessions.db, atau redis:// / rediss:// / unix://.
+    """
+    if url.startswith("memory://"):
+        store = MemorySessionStore()
+    elif url.startswith("sqlite:///"):
+        store = SQLiteSessionStore(url[len("sqlite:///"):])
+    else:
+        store = RedisSessionStore(url)
+    return ServerSessionInterface(store, lifetime, touch_interval)
@@ -0,0 +1,406 @@
+import atexit
+import json
+import logging
+import os
+import queue
+import random
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from urllib.parse import urlsplit
+import httpx
+from flask import current_app, g, has_request_context, request
+
+log = logging.getLogger(__name__)
+
+_TRACEPARENT = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+# OTLP span kinds / status codes
+_KIND_SERVER, _KIND_CLIENT = 2, 3
+_STATUS_UNSET, _STATUS_ERROR = 0, 2
+
+def _new_id(bits: int) -> str:
+    return f"{random.getrandbits(bits):0{bits // 4}x}"
+
+def _service_for(url) -> str:
+    # Supabase exposes every API on one host; tell them apart by path prefix
+    path = url.path
+    for prefix, service in (("/rest/", "postgrest"), ("/auth/", "auth"), ("/storage/", "storage"), ("/functions/", "functions")):
+        if path.startswith(prefix):
+            return service
+    return url.host
+
+class Span:
+    """Satu panggilan ke layanan upstream (Supabase, Xendit) di dalam sebuah request."""
+
+    __slots__ = ("span_id", "service", "method", "host", "path", "start_ns", "end_ns", "status", "request_bytes", "response_bytes", "error")
+
+    def __init__(self, service: str, method: str, url: str):
+        parts = urlsplit(url)
+        self.span_id = _new_id(64)
+        self.service = service
+        self.method = method
+        self.host = parts.hostname or ""
+        self.path = parts.path or "/"  # never the query string: it carries filter values
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.status = None
+        self.request_bytes = 0
+        self.response_bytes = 0
+        self.error = None
+
+    @property
+    def name(self) -> str:
+        return f"{self.method} {self.path}"
+
+    @property
+    def duration_ms(self) -> float:
+        return ((self.end_ns or time.time_ns()) - self.start_ns) / 1e6
+
+    def set_response(self, status: int, request_bytes: int = 0, response_bytes: int = 0):
+        self.status = status
+        self.request_bytes = request_bytes
+        self.response_bytes = response_bytes
+
+    def finish(self):
+        if self.end_ns is None:
+            self.end_ns = time.time_ns()
+
+class Trace:
+    """Span root untuk satu request Flask beserta span upstream di bawahnya."""
+
+    def __init__(self, traceparent: str = None, sample_rate: float = 1.0):
+        match = _TRACEPARENT.match(traceparent or "")
+        if match and match.group(1) != "0" * 32:
+            # Continue the caller's trace and follow its sampling decision
+            self.trace_id, self.parent_id = match.group(1), match.group(2)
+            self.sampled = bool(int(match.group(3), 16) & 1)
+        else:
+            self.trace_id, self.parent_id = _new_id(128), None
+            self.sampled = sample_rate >= 1 or random.random() < sample_rate
+        self.span_id = _new_id(64)
+        self.start_ns = time.time_ns()
+        self.end_ns = None
+        self.spans = []  # list.append is atomic, so fan-out threads can record directly
+
+    def add(self, span: Span):
+        self.spans.append(span)
+
+    def server_timing(self) -> str:
+        # Durations are summed per service, so concurrent calls can add up to more than `total`
+        by_service = {}
+        for span in self.spans:
+            entry = by_service.setdefault(span.service, [0, 0.0, 0])
+            entry[0] += 1
+            entry[1] += span.duration_ms
+            entry[2] += span.request_bytes + span.response_bytes
+        metrics = [
+            f'{service};desc="{calls} call{"s" if calls != 1 else ""}, {size} B";dur={dur:.1f}'
+            for service, (calls, dur, size) in by_service.items()
+        ]
+        metrics.append(f"total;dur={(self.end_ns - self.start_ns) / 1e6:.1f}")
+        return ", ".join(metrics)
+
+    def repeated_calls(self, threshold: int) -> dict:
+        counts = Counter(span.name for span in self.spans)
+        return {name: count for name, count in counts.items() if count >= threshold}
+
+def current_trace():
+    return g.get("_trace") if has_request_context() else None
+
+def _attr(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+def to_otlp(trace: Trace, root: dict, service_name: str) -> dict:
+    """Ubah trace menjadi ExportTraceServiceRequest OTLP/JSON (format collector OTLP/HTTP dan otlpjsonfile)."""
+    spans = [{
+        "traceId": trace.trace_id,
+        "spanId": trace.span_id,
+        "name": root["name"],
+        "kind": _KIND_SERVER,
+        "startTimeUnixNano": str(trace.start_ns),
+        "endTimeUnixNano": str(trace.end_ns),
+        "attributes": [
+            _attr("http.request.method", root["method"]),
+            _attr("url.path", root["path"]),
+            _attr("http.route", root["route"]),
+            _attr("http.response.status_code", root["status"]),
+            _attr("app.upstream.calls", len(trace.spans)),
+        ],
+        "status": {"code": _STATUS_ERROR if root["status"] >= 500 else _STATUS_UNSET},
+    }]
+    if trace.parent_id:
+        spans[0]["parentSpanId"] = trace.parent_id
+    for span in trace.spans:
+        attributes = [
+            _attr("peer.service", span.service),
+            _attr("server.address", span.host),
+            _attr("http.request.method", span.method),
+            _attr("url.path", span.path),
+            _attr("http.request.body.size", span.request_bytes),
+            _attr("http.response.body.size", span.response_bytes),
+        ]
+        if span.status is not None:
+            attributes.append(_attr("http.response.status_code", span.status))
+        if span.error:
+            attributes.append(_attr("error.type", span.error))
+        failed = span.error or (span.status or 0) >= 400
+        spans.append({
+            "traceId": trace.trace_id,
+            "spanId": span.span_id,
+            "parentSpanId": trace.span_id,
+            "name": span.name,
+            "kind": _KIND_CLIENT,
+            "startTimeUnixNano": str(span.start_ns),
+            "endTimeUnixNano": str(span.end_ns or trace.end_ns),
+            "attributes": attributes,
+            "status": {"code": _STATUS_ERROR if failed else _STATUS_UNSET},
+        })
+    return {
+        "resourceSpans": [{
+            "resource": {"attributes": [_attr("service.name", service_name)]},
+            "scopeSpans": [{"scope": {"name": __name__}, "spans": spans}],
+        }]
+    }
+
+class _CountingStream(httpx.SyncByteStream):
+    # Counts response bytes as the caller reads them; the span ends when the body is closed
+    def __init__(self, stream, span: Span):
+        self._stream = stream
+        self._span = span
+
+    def __iter__(self):
+        for chunk in self._stream:
+            self._span.response_bytes += len(chunk)
+            yield chunk
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._span.finish()
+
+class _AsyncCountingStream(httpx.AsyncByteStream):
+    def __init__(self, stream, span: Span):
+        self._stream = stream
+        self._span = span
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._span.response_bytes += len(chunk)
+            yield chunk
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._span.finish()
+
+def _start_client_span(request: httpx.Request):
+    trace = current_trace()
+    if trace is None:
+        return None
+    span = Span(_service_for(request.url), request.method, str(request.url))
+    span.request_bytes = int(request.headers.get("content-length") or 0)
+    trace.add(span)
+    return span
+
+class TracingTransport(httpx.BaseTransport):
+    """Transport httpx yang mencatat setiap request upstream sebagai span di trace request Flask yang aktif."""
+
+    def __init__(self, transport: httpx.BaseTransport):
+        self._transport = transport
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        span = _start_client_span(request)
+        if span is None:
+            return self._transport.handle_request(request)
+        try:
+            response = self._transport.handle_request(request)
+        except Exception as e:
+            span.error = type(e).__name__
+            span.finish()
+            raise
+        span.status = response.status_code
+        response.stream = _CountingStream(response.stream, span)
+        return response
+
+    def close(self):
+        self._transport.close()
+
+class AsyncTracingTransport(httpx.AsyncBaseTransport):
+    """Pasangan async dari TracingTransport untuk client di event loop I/O."""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport):
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        span = _start_client_span(request)
+        if span is None:
+            return await self._transport.handle_async_request(request)
+        try:
+            response = await self._transport.handle_async_request(request)
+        except Exception as e:
+            span.error = type(e).__name__
+            span.finish()
+            raise
+        span.status = response.status_code
+        response.stream = _AsyncCountingStream(response.stream, span)
+        return response
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+@contextmanager
+def upstream_span(service: str, method: str, url: str):
+    """
+    Catat panggilan upstream yang tidak lewat httpx (mis. `requests.post` ke
+    Xendit). Isi status dan ukuran payload dengan span.set_response(...).
+    """
+    span = Span(service, method, url)
+    trace = current_trace()
+    if trace is not None:
+        trace.add(span)
+    try:
+        yield span
+    except Exception as e:
+        span.error = type(e).__name__
+        raise
+    finally:
+        span.finish()
+
+class SpanExporter:
+    """
+    Kirim trace ke `target` dari thread latar belakang: file:///path/spans.jsonl
+    (satu ExportTraceServiceRequest OTLP/JSON per baris) atau URL OTLP/HTTP
+    collector, mis. http://localhost:4318/v1/traces. Jika antrian penuh, trace
+    dibuang dan dihitung, request tidak pernah menunggu.
+    """
+
+    def __init__(self, target: str, service_name: str, queue_size: int = 2048, batch_size: int = 256):
+        self.target = target
+        self.service_name = service_name
+        self.batch_size = batch_size
+        self.queue = queue.Queue(queue_size)
+        self.exported = 0
+        self.dropped = 0
+        self.errors = 0
+        self._pid = None
+        self._lock = threading.Lock()
+        self._http = None
+
+    def put(self, trace: Trace, root: dict):
+        if self._pid != os.getpid():
+            self._start()
+        try:
+            self.queue.put_nowait((trace, root))
+        except queue.Full:
+            self.dropped += 1
+
+    def _start(self):
+        # Threads do not survive fork, so (re)start the writer per process
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            threading.Thread(target=self._run, name="trace-exporter", daemon=True).start()
+            self._pid = os.getpid()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._export(batch)
+
+    def flush(self):
+        batch = []
+        while True:
+            try:
+                batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                break
+        if batch:
+            self._export(batch)
+
+    def _export(self, batch: list):
+        exports = [to_otlp(trace, root, self.service_name) for trace, root in batch]
+        try:
+            if self.target.startswith("file://"):
+                with open(self.target[len("file://"):], "a", encoding="utf-8") as f:
+                    f.writelines(json.dumps(r, separators=(",", ":")) + "\n" for r in exports)
+            else:
+                # One OTLP request for the whole batch
+                payload = {"resourceSpans": [rs for r in exports for rs in r["resourceSpans"]]}
+                if self._http is None:
+                    self._http = httpx.Client(timeout=10)
+                self._http.post(self.target, json=payload).raise_for_status()
+        except (OSError, httpx.HTTPError) as e:
+            self.errors += 1
+            log.warning("Exporting traces failed", extra={"target": self.target, "traces": len(batch), "error": str(e)})
+            return
+        self.exported += len(batch)
+
+    def stats(self) -> dict:
+        return {"target": self.target, "queued": self.queue.qsize(), "exported": self.exported, "dropped": self.dropped, "errors": self.errors}
+
+_exporter = None
+
+def start_trace():
+    if request.endpoint == "static":
+        return
+    g._trace = Trace(request.headers.get("traceparent"), current_app.config["TRACE_SAMPLE_RATE"])
+
+def finish_trace(response):
+    trace = g.pop("_trace", None)
+    if trace is None:
+        return response
+    trace.end_ns = time.time_ns()
+    config = current_app.config
+
+    if config["SERVER_TIMING"]:
+        response.headers.add("Server-Timing", trace.server_timing())
+
+    threshold = config["TRACE_REPEAT_WARN"]
+    if threshold:
+        # The same upstream call made over and over in one request is usually an N+1 query
+        for name, count in trace.repeated_calls(threshold).items():
+            log.warning("Repeated upstream call", extra={"endpoint": request.endpoint, "call": name, "count": count})
+
+    if _exporter is not None and trace.sampled:
+        route = request.url_rule.rule if request.url_rule else request.path
+        _exporter.put(trace, {
+            "name": f"{request.method} {route}",
+            "method": request.method,
+            "path": request.path,
+            "route": route,
+            "status": response.status_code,
+        })
+    return response
+
+def init_tracing(app):
+    """
+    Pasang tracing per request: setiap panggilan ke Supabase (lewat client httpx
+    ber-TracingTransport) dan ke Xendit dicatat jumlah, latensi, dan ukuran
+    payload-nya, lalu dikirim sebagai header Server-Timing dan, jika
+    TRACE_EXPORT diisi, sebagai span OpenTelemetry (OTLP/JSON).
+    """
+    global _exporter
+    if app.config["TRACE_EXPORT"] and _exporter is None:
+        _exporter = SpanExporter(app.config["TRACE_EXPORT"], app.config["TRACE_SERVICE_NAME"])
+    app.before_request(start_trace)
+    app.after_request(finish_trace)
+
+def trace_stats() -> dict:
+    if _exporter is None:
+        return {"exporting": False}
+    return {"exporting": True, **_exporter.stats()}
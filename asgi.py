@@ -0,0 +1,21 @@
+from concurrent.futures import ThreadPoolExecutor
+from asgiref.sync import SyncToAsync
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance
+from app import create_app
+
+flask_app = create_app()
+
+# asgiref runs every WSGI call on one thread-sensitive executor, i.e. one
+# request at a time per worker; Flask is thread-safe, so use a plain pool
+_executor = ThreadPoolExecutor(max_workers=flask_app.config["ASGI_THREADS"], thread_name_prefix="asgi")
+
+class _PooledInstance(WsgiToAsgiInstance):
+    run_wsgi_app = SyncToAsync(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False, executor=_executor
+    )
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    async def __call__(self, scope, receive, send):
+        await _PooledInstance(self.wsgi_application, self.duplicate_header_limit)(scope, receive, send)
+
+app = PooledWsgiToAsgi(flask_app)
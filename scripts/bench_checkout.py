@@ -0,0 +1,196 @@
+"""
+Benchmark checkout lewat HTTP sungguhan terhadap PostgREST tiruan lokal yang
+menambahkan latency tetap pada setiap request: wsgi.py di bawah gunicorn
+(gthread), asgi.py di bawah uvicorn, dan asgi.py dengan ASYNC_IO=true;
+masing-masing satu worker di prosesnya sendiri, dipanaskan dulu sebelum
+diukur. Exit code 1 jika ada request yang gagal (status selain 201 atau
+error koneksi).
+
+    python scripts/bench_checkout.py --latency 40 --concurrency 16 --duration 10
+"""
+import argparse
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SECRET_KEY = "bench-secret-key"
+JWT_SECRET = "bench-secret-bench-secret-bench-secret"
+
+ADDRESS = {"id": "addr-1"}
+CART_LINE = {"product_id": "p1", "quantity": 2, "products": {"price": 100000, "discount": 0}}
+ORDER = {"order_id": "o1", "user_id": "u1", "total_price": 200000, "status": "pending", "address_id": "addr-1", "items": []}
+
+def stand_in(latency: float) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1  # one write per response (avoids Nagle/delayed-ACK stalls)
+
+        def _reply(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            if length:
+                self.rfile.read(length)
+            time.sleep(latency)
+            if "/rpc/checkout_cart" in self.path:
+                data = ORDER
+            elif self.path.startswith("/rest/v1/addresses"):
+                data = [ADDRESS]
+            elif self.path.startswith("/rest/v1/cart"):
+                data = [CART_LINE]
+            else:
+                data = []
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        do_GET = do_POST = do_PATCH = do_DELETE = _reply
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024  # listen() runs in __init__; the default backlog of 5 resets connections
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+GUNICORN = ["gunicorn", "wsgi:app", "--worker-class", "gthread", "--workers", "1", "--threads", "32", "--backlog", "1024", "--log-level", "warning"]
+UVICORN = ["uvicorn", "asgi:app", "--workers", "1", "--backlog", "1024", "--lifespan", "off", "--log-level", "warning"]
+MODES = (
+    ("wsgi", GUNICORN, {"ASYNC_IO": "false"}),
+    ("asgi", UVICORN, {"ASYNC_IO": "false"}),
+    ("asgi+async_io", UVICORN, {"ASYNC_IO": "true"}),
+)
+
+def serve(mode: str, command: list, env: dict) -> tuple:
+    port = free_port()
+    bind = ["--bind", f"127.0.0.1:{port}"] if command is GUNICORN else ["--host", "127.0.0.1", "--port", str(port)]
+    proc = subprocess.Popen([sys.executable, "-m", *command, *bind], cwd=ROOT, env=env)
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        if proc.poll() is not None:
+            raise RuntimeError(f"{mode} server exited with {proc.returncode}")
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.5).close()
+            return proc, f"http://127.0.0.1:{port}"
+        except OSError:
+            time.sleep(0.1)
+    proc.kill()
+    raise RuntimeError(f"{mode} server did not start")
+
+def session_cookie(supabase_url: str, user_id: str = "u1") -> dict:
+    # Signed Flask cookie session carrying an HS256 token accepted by authenticate_request
+    import jwt
+    from flask import Flask
+    from flask.sessions import SecureCookieSessionInterface
+
+    now = int(time.time())
+    claims = {"sub": user_id, "aud": "authenticated", "iss": f"{supabase_url}/auth/v1", "iat": now, "exp": now + 3600}
+    token = jwt.encode(claims, JWT_SECRET, algorithm="HS256")
+    signer = Flask(__name__)
+    signer.secret_key = SECRET_KEY
+    value = SecureCookieSessionInterface().get_signing_serializer(signer).dumps({"user_id": user_id, "access_token": token})
+    return {"session": value}
+
+def run(url: str, cookies: dict, concurrency: int, duration: float, body: dict) -> dict:
+    import httpx
+
+    latencies, failures = [], []
+    lock = threading.Lock()
+    clock = {}
+    # The last warmed-up worker starts the clock, before any worker is released
+    ready = threading.Barrier(concurrency, action=lambda: clock.setdefault("deadline", time.perf_counter() + duration))
+
+    def worker():
+        local, failed = [], []
+        with httpx.Client(base_url=url, cookies=cookies, timeout=30) as client:
+            # Warm-up outside the timed window: lazy imports, pools and the verified-token cache
+            try:
+                client.post("/api/checkout", json=body)
+            except httpx.HTTPError as e:
+                failed.append(f"warm-up {type(e).__name__}: {e}")
+            ready.wait()
+            while time.perf_counter() < clock["deadline"]:
+                started = time.perf_counter()
+                try:
+                    resp = client.post("/api/checkout", json=body)
+                except httpx.HTTPError as e:
+                    failed.append(f"{type(e).__name__}: {e}")
+                    continue
+                if resp.status_code != 201:
+                    failed.append(f"{resp.status_code} {resp.text[:200]}")
+                    continue
+                local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+            failures.extend(failed)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "failures": failures,
+        "rps": len(latencies) / duration,
+        "p50_ms": latencies[len(latencies) // 2] * 1000 if latencies else 0,
+        "p95_ms": latencies[int(len(latencies) * 0.95)] * 1000 if latencies else 0,
+    }
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=40, help="injected latency per PostgREST call (ms)")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10, help="seconds per mode")
+    parser.add_argument("--default-address", action="store_true", help="omit address_id (adds the default-address lookup)")
+    args = parser.parse_args()
+
+    stand = stand_in(args.latency / 1000)
+    supabase_url = f"http://127.0.0.1:{stand.server_port}"
+    env = {
+        **os.environ,
+        "SUPABASE_URL": supabase_url,
+        "SUPABASE_ANON_KEY": "anon",
+        "SUPABASE_JWT_SECRET": JWT_SECRET,
+        "SECRET_KEY": SECRET_KEY,
+        "SESSION_STORE_URL": "",
+        "SEARCH_INDEX_ENABLED": "false",
+        "WEBHOOK_WORKER_THREAD": "false",
+        "LOG_LEVEL": "WARNING",
+    }
+    cookies = session_cookie(supabase_url)
+
+    body = {} if args.default_address else {"address_id": ADDRESS["id"]}
+    failed = 0
+    for mode, command, overrides in MODES:
+        proc, url = serve(mode, command, {**env, **overrides})
+        try:
+            result = run(url, cookies, args.concurrency, args.duration, body)
+        finally:
+            proc.terminate()
+            proc.wait(10)
+        print(f">>> {mode:13}  {result['requests']:6d} req  {result['rps']:8.1f} req/s  "
+              f"p50 {result['p50_ms']:7.1f} ms  p95 {result['p95_ms']:7.1f} ms  {len(result['failures'])} failed")
+        for failure in result["failures"][:5]:
+            print(f">>>        {failure}")
+        failed += len(result["failures"])
+
+    print(">>> FAILED" if failed else ">>> all requests succeeded")
+    sys.exit(1 if failed else 0)
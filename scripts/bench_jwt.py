@@ -0,0 +1,86 @@
+"""
+Benchmark verify_supabase_jwt (RS256) terhadap endpoint JWKS tiruan lokal:
+PyJWKClient baru per panggilan (perilaku lama) vs JWKS cache vs cache token terverifikasi.
+
+    python scripts/bench_jwt.py --latency 50 --seconds 3
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+def jwks_stub(jwks: dict, latency: float) -> ThreadingHTTPServer:
+    body = json.dumps(jwks).encode()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+
+        def do_GET(self):
+            time.sleep(latency)
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def rate(fn, seconds: float) -> float:
+    count, deadline = 0, time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        fn()
+        count += 1
+    return count / seconds
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=50, help="injected JWKS endpoint latency (ms)")
+    parser.add_argument("--seconds", type=float, default=3, help="seconds per mode")
+    args = parser.parse_args()
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": "bench", "alg": "RS256", "use": "sig"})
+    server = jwks_stub({"keys": [jwk]}, args.latency / 1000)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ["SUPABASE_ANON_KEY"] = "anon"
+    os.environ["WEBHOOK_WORKER_THREAD"] = "false"
+
+    from app import create_app
+    from app.utils import security
+
+    now = int(time.time())
+    claims = {"sub": "u1", "aud": "authenticated", "iss": f"{base_url}/auth/v1", "iat": now, "exp": now + 3600, "role": "authenticated"}
+    token = jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": "bench"})
+
+    def uncached():
+        key = jwt.PyJWKClient(f"{base_url}/auth/v1/keys").get_signing_key_from_jwt(token)
+        jwt.decode(token, key.key, algorithms=["RS256"], audience="authenticated", issuer=claims["iss"])
+
+    app = create_app()
+    with app.app_context():
+        jwks, verified = security._jwt_caches()
+
+        def jwks_only():
+            verified._cache.clear()
+            security.verify_supabase_jwt(token)
+
+        for name, fn in (("new PyJWKClient", uncached), ("cached JWKS", jwks_only), ("verified cache", lambda: security.verify_supabase_jwt(token))):
+            print(f">>> {name:16} {rate(fn, args.seconds):10.0f} verifications/s")
+        print(f">>> JWKS fetches: {jwks.stats()['fetches']}")
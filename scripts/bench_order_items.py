@@ -0,0 +1,94 @@
+"""
+Micro-benchmark penyimpanan order_items: insert per baris (pola lama) vs
+insert_order_items (bulk upsert per chunk) terhadap PostgREST tiruan lokal
+dengan latency tetap, untuk order berisi 1, 10, dan 100 baris.
+
+    python scripts/bench_order_items.py --lines 1 10 100 --latency 20 --repeat 5
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+def stand_in(latency: float, state: dict) -> ThreadingHTTPServer:
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1  # one write per response (avoids Nagle/delayed-ACK stalls)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            payload = json.loads(self.rfile.read(length) or b"[]")
+            time.sleep(latency)
+            with lock:
+                state["requests"] += 1
+                state["rows"] += len(payload) if isinstance(payload, list) else 1
+            if "return=minimal" in (self.headers.get("Prefer") or ""):
+                self.send_response(201)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = json.dumps(payload if isinstance(payload, list) else [payload]).encode()
+            self.send_response(201)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def per_row(sb, order_id: str, lines: list):
+    # The old loop: one insert request per order line
+    for item in lines:
+        sb.table("order_items").insert({
+            "order_id": order_id,
+            "product_id": item["product_id"],
+            "quantity": item["quantity"],
+            "price": item["price"],
+        }).execute()
+
+def measure(fn, sb, lines: list, repeat: int, state: dict) -> tuple:
+    state["requests"] = state["rows"] = 0
+    started = time.perf_counter()
+    for i in range(repeat):
+        fn(sb, f"order-{i}", lines)
+    elapsed = (time.perf_counter() - started) * 1000 / repeat
+    return elapsed, state["requests"] // repeat, state["rows"] // repeat
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--lines", type=int, nargs="+", default=[1, 10, 100], help="order sizes (line items)")
+    parser.add_argument("--latency", type=float, default=20, help="injected latency per PostgREST call (ms)")
+    parser.add_argument("--repeat", type=int, default=5, help="orders written per size and mode")
+    args = parser.parse_args()
+
+    state = {"requests": 0, "rows": 0}
+    server = stand_in(args.latency / 1000, state)
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_ANON_KEY"] = "anon"
+    os.environ["WEBHOOK_WORKER_THREAD"] = "false"
+
+    from app import create_app
+    from app.extensions import anon_client
+    from app.services.orders_svc import insert_order_items
+
+    app = create_app()
+    with app.app_context():
+        sb = anon_client()
+        for count in args.lines:
+            lines = [{"product_id": f"p{i}", "quantity": 1, "price": 1000} for i in range(count)]
+            for name, fn in (("per-row", per_row), ("bulk", insert_order_items)):
+                ms, requests, rows = measure(fn, sb, lines, args.repeat, state)
+                print(f">>> {count:4d} lines  {name:8}  {requests:4d} requests/order  {rows:4d} rows/order  {ms:8.1f} ms/order")
@@ -0,0 +1,155 @@
+"""
+Hitung round trip ke Supabase untuk GET /api/orders terhadap PostgREST tiruan
+lokal, untuk user dengan riwayat order yang makin panjang. Setiap halaman
+harus tetap 2 query (orders + order_items), berapa pun jumlah order-nya,
+dan cursor harus melewati setiap order tepat sekali meski banyak order
+berbagi created_at yang sama; exit code 1 jika tidak. Sebagai pembanding
+dicetak juga jumlah query pola lama (satu query order_items per order).
+
+    python scripts/bench_order_queries.py --orders 1 10 150 --limit 20 --latency 5
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import threading
+import time
+from datetime import datetime
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+# or=(created_at.lt."X",and(created_at.eq."X",order_id.lt.Y)) as sent by list_orders
+KEYSET = re.compile(r'\(created_at\.lt\."([^"]+)",and\(created_at\.eq\."[^"]+",order_id\.lt\.([0-9a-f-]+)\)\)')
+
+def make_orders(count: int) -> list:
+    # Three orders per timestamp (e.g. a batch checkout), sorted like the endpoint:
+    # created_at desc, then order_id desc
+    orders = [
+        {"order_id": f"00000000-0000-4000-8000-{i:012d}", "user_id": "u1", "status": "pending", "total_price": 1000,
+         "created_at": f"2025-01-01T00:00:00.{i // 3:06d}+00:00"}
+        for i in range(count)
+    ]
+    return sorted(orders, key=lambda o: (o["created_at"], o["order_id"]), reverse=True)
+
+def timestamp(value: str) -> datetime:
+    return datetime.fromisoformat(value)
+
+def stand_in(latency: float, state: dict) -> ThreadingHTTPServer:
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1  # one write per response (avoids Nagle/delayed-ACK stalls)
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlsplit(self.path)
+            params = parse_qs(url.query)
+            with lock:
+                state["calls"] += 1
+            if url.path == "/rest/v1/orders":
+                rows = state["orders"]
+                if "or" in params:
+                    created_at, order_id = KEYSET.fullmatch(params["or"][0]).groups()
+                    before = timestamp(created_at)
+                    rows = [
+                        o for o in rows
+                        if timestamp(o["created_at"]) < before
+                        or (timestamp(o["created_at"]) == before and o["order_id"] < order_id)
+                    ]
+                offset = int(params.get("offset", ["0"])[0])
+                limit = int(params.get("limit", [str(len(rows))])[0])
+                data = rows[offset:offset + limit]
+            elif url.path == "/rest/v1/order_items":
+                wanted = params.get("order_id", [""])[0]
+                ids = wanted[len("in.("):-1].split(",") if wanted.startswith("in.(") else [wanted.removeprefix("eq.")]
+                data = [{"order_id": oid, "product_id": "p1", "quantity": 1, "price": 1000} for oid in ids]
+            else:
+                data = []
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def per_order_queries(app, limit: int) -> int:
+    # The old pattern: one order_items query per order on the page
+    from app.extensions import anon_client
+
+    with app.app_context():
+        sb = anon_client()
+        orders = sb.table("orders").select("*").eq("user_id", "u1").order("created_at", desc=True).range(0, limit - 1).execute().data
+        for order in orders:
+            sb.table("order_items").select("*").eq("order_id", order["order_id"]).execute()
+    return 1 + len(orders)
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--orders", type=int, nargs="+", default=[1, 10, 150], help="order history sizes")
+    parser.add_argument("--limit", type=int, default=20, help="page size")
+    parser.add_argument("--latency", type=float, default=5, help="injected latency per PostgREST call (ms)")
+    args = parser.parse_args()
+
+    state = {"calls": 0, "orders": []}
+    server = stand_in(args.latency / 1000, state)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ["SUPABASE_ANON_KEY"] = "anon"
+    os.environ["SUPABASE_JWT_SECRET"] = "bench-secret-bench-secret-bench-secret"
+    os.environ["WEBHOOK_WORKER_THREAD"] = "false"
+
+    from app import create_app
+
+    app = create_app()
+    client = app.test_client()
+    now = int(time.time())
+    claims = {"sub": "u1", "aud": "authenticated", "iss": f"{base_url}/auth/v1", "iat": now, "exp": now + 3600}
+    with client.session_transaction() as s:
+        s["user_id"] = "u1"
+        s["access_token"] = jwt.encode(claims, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+
+    client.get("/api/orders")  # warm up connections and the verified-token cache
+
+    ok = True
+    for count in args.orders:
+        state["orders"] = make_orders(count)
+
+        # First page, then the rest of the history via the cursor
+        pages, seen, cursor, worst = 0, [], None, 0
+        started = time.perf_counter()
+        while True:
+            state["calls"] = 0
+            resp = client.get("/api/orders", query_string={"limit": args.limit, **({"cursor": cursor} if cursor else {})})
+            body = resp.get_json()
+            if resp.status_code != 200:
+                raise RuntimeError(f"GET /api/orders failed: {resp.status_code} {resp.get_data(as_text=True)}")
+            pages += 1
+            seen += [o["order_id"] for o in body["data"]]
+            worst = max(worst, state["calls"])
+            cursor = body["next_cursor"]
+            if not cursor:
+                break
+        elapsed = (time.perf_counter() - started) * 1000 / pages
+
+        state["calls"] = 0
+        old = per_order_queries(app, args.limit)
+        print(f">>> {count:4d} orders  {pages:3d} pages  {len(set(seen)):4d} distinct rows  {worst} queries/page (max)  "
+              f"{elapsed:6.1f} ms/page  | per-order lookups: {old} queries for the first page")
+        ok = ok and worst <= 2 and seen == [o["order_id"] for o in state["orders"]]
+
+    print(">>> O(1) queries per page, every order exactly once" if ok else ">>> FAILED")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,121 @@
+"""
+Uji beban RequestClient: banyak user bersamaan terhadap PostgREST tiruan lokal.
+Setiap request upstream dicek bahwa header Authorization-nya milik user yang
+sama dengan filter user_id di query, dan setiap response hanya berisi baris
+milik user tersebut. Exit code 1 jika ada kebocoran header antar user.
+
+    python scripts/bench_request_clients.py --users 200 --rounds 5 --latency 20
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+
+def stand_in(latency: float, seen: dict) -> ThreadingHTTPServer:
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1  # one write per response (avoids Nagle/delayed-ACK stalls)
+
+        def do_GET(self):
+            time.sleep(latency)
+            url = urlsplit(self.path)
+            bearer = (self.headers.get("Authorization") or "").removeprefix("Bearer ")
+            caller = jwt.decode(bearer, options={"verify_signature": False}).get("sub") if bearer.count(".") == 2 else None
+            data = []
+            if url.path == "/rest/v1/orders":
+                user_filter = parse_qs(url.query).get("user_id", [""])[0].removeprefix("eq.")
+                with lock:
+                    seen["calls"] += 1
+                    if caller != user_filter:
+                        seen["mismatches"] += 1
+                # Rows "visible" to the caller, as RLS would return them
+                data = [{"order_id": f"o-{caller}", "user_id": caller, "created_at": "2025-01-01T00:00:00+00:00"}]
+            body = json.dumps(data).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    class Server(ThreadingHTTPServer):
+        daemon_threads = True
+        request_queue_size = 1024  # listen() runs in __init__; the default backlog of 5 resets connections
+
+    server = Server(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def access_token(base_url: str, user_id: str) -> str:
+    now = int(time.time())
+    claims = {"sub": user_id, "aud": "authenticated", "iss": f"{base_url}/auth/v1", "iat": now, "exp": now + 3600}
+    return jwt.encode(claims, os.environ["SUPABASE_JWT_SECRET"], algorithm="HS256")
+
+def run(app, users: int, rounds: int) -> dict:
+    result = {"requests": 0, "errors": 0, "foreign_rows": 0}
+    lock = threading.Lock()
+    barrier = threading.Barrier(users)
+
+    def worker(user_id: str):
+        client = app.test_client()
+        with client.session_transaction() as s:
+            s["user_id"] = user_id
+            s["access_token"] = access_token(app.config["SUPABASE_URL"], user_id)
+        errors = foreign = 0
+        for _ in range(rounds):
+            barrier.wait()  # all users hit the app at the same moment
+            resp = client.get("/api/orders")
+            if resp.status_code != 200:
+                errors += 1
+                continue
+            foreign += sum(1 for row in resp.get_json()["data"] if row["user_id"] != user_id)
+        with lock:
+            result["requests"] += rounds
+            result["errors"] += errors
+            result["foreign_rows"] += foreign
+
+    threads = [threading.Thread(target=worker, args=(f"user-{i}",)) for i in range(users)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return result
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200, help="concurrent users (one thread each)")
+    parser.add_argument("--rounds", type=int, default=5, help="requests per user")
+    parser.add_argument("--latency", type=float, default=20, help="injected latency per PostgREST call (ms)")
+    args = parser.parse_args()
+
+    seen = {"calls": 0, "mismatches": 0}
+    server = stand_in(args.latency / 1000, seen)
+    os.environ["SUPABASE_URL"] = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_ANON_KEY"] = "anon"
+    os.environ["SUPABASE_JWT_SECRET"] = "bench-secret-bench-secret-bench-secret"
+    os.environ["WEBHOOK_WORKER_THREAD"] = "false"
+
+    from app import create_app
+
+    app = create_app()
+    started = time.perf_counter()
+    result = run(app, args.users, args.rounds)
+    elapsed = time.perf_counter() - started
+    print(f">>> {result['requests']} requests from {args.users} concurrent users in {elapsed:.1f}s")
+    print(f">>> upstream orders queries: {seen['calls']}, Authorization/user_id mismatches: {seen['mismatches']}")
+    print(f">>> errors: {result['errors']}, rows of another user returned: {result['foreign_rows']}")
+    ok = seen["mismatches"] == 0 and result["foreign_rows"] == 0 and result["errors"] == 0 and seen["calls"] == result["requests"]
+    print(">>> no cross-user header bleed" if ok else ">>> FAILED")
+    sys.exit(0 if ok else 1)
@@ -0,0 +1,141 @@
+"""
+Benchmark ProductSearchIndex dengan katalog sintetis: ukuran per produk,
+latency query (prefix pendek sampai kata lengkap, semua sort, halaman
+pertama dan lewat cursor), stats(), dan upsert yang menambah token baru.
+Hasil setiap query dicocokkan dengan pencarian brute force; exit code 1
+jika ada yang berbeda.
+
+    python scripts/bench_search_index.py --products 100000 --queries 200
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.services.search_index import ProductSearchIndex, tokenize, _FIELD_WEIGHTS
+
+WORDS = [
+    "kaos", "kemeja", "celana", "jaket", "sepatu", "sandal", "tas", "topi", "jam", "kacamata",
+    "katun", "denim", "kulit", "polos", "motif", "slim", "oversize", "premium", "original", "anak",
+    "wanita", "pria", "hitam", "putih", "merah", "biru", "navy", "abu", "cokelat", "hijau",
+]
+BRANDS = ["Erigo", "Roughneck", "Eiger", "Bodypack", "Compass", "Ventela", "Brodo", "Screamous"]
+CATEGORIES = ["Atasan", "Bawahan", "Outer", "Sepatu", "Aksesoris", "Tas"]
+SORTS = [("created_at", True), ("sold_count", True), ("rating", True), ("price", False), ("price", True)]
+
+def make_products(count: int, rng: random.Random) -> list:
+    epoch = datetime(2024, 1, 1, tzinfo=timezone.utc)
+    return [
+        {
+            "id": f"{i:08d}-0000-4000-8000-000000000000",
+            "name": " ".join(rng.sample(WORDS, 4)) + f" seri{rng.randrange(5000)}",
+            "brand": rng.choice(BRANDS),
+            "category": rng.choice(CATEGORIES),
+            "images": [f"https://cdn.example.com/p/{i}/{n}.webp" for n in range(4)],
+            "price": rng.randrange(20, 2000) * 1000,
+            "discount": rng.choice([0, 0, 10, 25]),
+            "rating": round(rng.uniform(3, 5), 1),
+            "review_count": rng.randrange(500),
+            "sold_count": rng.randrange(10000),
+            "created_at": (epoch + timedelta(seconds=rng.randrange(60_000_000))).isoformat(),
+        }
+        for i in range(count)
+    ]
+
+def brute_force(rows: dict, q: str, filters: dict, column: str, desc: bool, relevance: bool) -> list:
+    # Reference ordering: score desc then id, or sort column then id
+    hits = []
+    for row in rows.values():
+        tokens = {}
+        for field, weight in _FIELD_WEIGHTS:
+            for token in tokenize(row.get(field)):
+                tokens[token] = max(tokens.get(token, 0), weight)
+        score = 0
+        for word in tokenize(q):
+            best = max((w for t, w in tokens.items() if t.startswith(word)), default=0)
+            if not best:
+                break
+            score += best
+        else:
+            if (brand := filters.get("brand")) and row["brand"] != brand:
+                continue
+            if (min_price := filters.get("min_price")) is not None and row["price"] < min_price:
+                continue
+            hits.append((row, score))
+    if relevance:
+        hits.sort(key=lambda rs: (-rs[1], rs[0]["id"]))
+    else:
+        hits.sort(key=lambda rs: rs[0]["id"])
+        hits.sort(key=lambda rs: rs[0][column], reverse=desc)
+    return [row for row, _ in hits]
+
+def percentile(samples: list, share: float) -> float:
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(len(samples) * share))] * 1000
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--products", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=200, help="timed queries per query shape")
+    parser.add_argument("--checks", type=int, default=40, help="queries compared with brute force")
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    products = make_products(args.products, rng)
+    index = ProductSearchIndex()
+    started = time.perf_counter()
+    index.rebuild(products)
+    print(f">>> built {args.products} products in {time.perf_counter() - started:.1f}s")
+
+    started = time.perf_counter()
+    stats = index.stats()
+    print(f">>> stats(): {(time.perf_counter() - started) * 1000:.0f} ms, "
+          f"{stats['approx_bytes'] / 2**20:.1f} MiB, {stats['approx_bytes_per_product']} bytes/product")
+
+    shapes = {"1-char prefix": lambda: rng.choice(WORDS)[0], "3-char prefix": lambda: rng.choice(WORDS)[:3],
+              "two words": lambda: " ".join(rng.sample(WORDS, 2))}
+    for name, make_query in shapes.items():
+        timings = []
+        for i in range(args.queries):
+            column, desc = SORTS[i % len(SORTS)]
+            relevance = i % 6 == 5
+            started = time.perf_counter()
+            index.search(make_query(), {}, column, desc, relevance=relevance, limit=args.limit)
+            timings.append(time.perf_counter() - started)
+        print(f">>> {name:14}  p50 {percentile(timings, 0.5):6.2f} ms  p95 {percentile(timings, 0.95):6.2f} ms")
+
+    # Upserts: an existing product renamed to a brand-new token, with every sort order built
+    timings = []
+    for i in range(50):
+        row = dict(products[rng.randrange(len(products))], name=f"barang baru{i}x{rng.randrange(10**9)}")
+        started = time.perf_counter()
+        index.upsert(row)
+        timings.append(time.perf_counter() - started)
+        products[int(row["id"][:8])] = row
+    print(f">>> upsert with a new token  p50 {percentile(timings, 0.5):6.2f} ms  p95 {percentile(timings, 0.95):6.2f} ms")
+
+    # Correctness against brute force, including cursor pages, filters and the upserted rows
+    by_id = {row["id"]: row for row in products}
+    mismatches = 0
+    for i in range(args.checks):
+        q = rng.choice([rng.choice(WORDS)[:2], rng.choice(WORDS), "baru", " ".join(rng.sample(WORDS, 2))])
+        column, desc = SORTS[i % len(SORTS)]
+        relevance = i % 4 == 3
+        filters = rng.choice([{}, {"brand": rng.choice(BRANDS)}, {"min_price": 500000}])
+        expected = [row["id"] for row in brute_force(by_id, q, filters, column, desc, relevance)]
+        page = index.search(q, filters, column, desc, relevance=relevance, offset=args.limit, limit=args.limit)
+        ok = page == expected[args.limit:2 * args.limit]
+        if not relevance and expected[:args.limit]:
+            last = by_id[expected[args.limit - 1]] if len(expected) >= args.limit else by_id[expected[-1]]
+            after = index.search(q, filters, column, desc, limit=args.limit, after={"v": last[column], "id": last["id"]})
+            ok = ok and after == expected[args.limit:2 * args.limit]
+        if not ok:
+            mismatches += 1
+            print(f">>> mismatch for {q!r} {filters} sort={column}{' desc' if desc else ''} relevance={relevance}")
+    print(f">>> {args.checks} queries checked against brute force, {mismatches} mismatches")
+    sys.exit(1 if mismatches else 0)
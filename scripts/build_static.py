@@ -0,0 +1,10 @@
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from app.utils.assets import build_static
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static")
+
+if __name__ == "__main__":
+    manifest = build_static(STATIC_DIR)
+    print(f">>> Wrote {len(manifest)} hashed assets (+ .gz/.br variants) to static/dist/")
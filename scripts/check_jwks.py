@@ -0,0 +1,141 @@
+"""
+Cek perilaku JWKS cache dan cache token terverifikasi terhadap endpoint JWKS
+tiruan lokal (RS256): kid baru memicu fetch ulang yang dibatasi sekali per
+JWKS_MIN_REFETCH_INTERVAL, key terakhir yang valid tetap dipakai saat
+endpoint mati, dan token di cache berhenti berlaku tepat di `exp`.
+Exit code 1 jika ada cek yang gagal.
+
+    python scripts/check_jwks.py --interval 1
+"""
+import argparse
+import json
+import os
+import sys
+import threading
+import time
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import jwt
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+def jwks_stub(state: dict) -> ThreadingHTTPServer:
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        wbufsize = -1
+
+        def do_GET(self):
+            state["hits"] += 1
+            if state["down"]:
+                self.send_response(503)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = json.dumps({"keys": [jwk for _, jwk in state["keys"].values()]}).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def signing_key(kid: str) -> tuple:
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    jwk.update({"kid": kid, "alg": "RS256", "use": "sig"})
+    return private_key, jwk
+
+def token(base_url: str, private_key, kid: str, exp_in: float = 3600) -> str:
+    now = time.time()
+    claims = {"sub": "u1", "aud": "authenticated", "iss": f"{base_url}/auth/v1", "iat": int(now), "exp": int(now + exp_in), "jti": str(now)}
+    return jwt.encode(claims, private_key, algorithm="RS256", headers={"kid": kid})
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--interval", type=float, default=1, help="JWKS_MIN_REFETCH_INTERVAL for the check (s)")
+    args = parser.parse_args()
+
+    keys = {kid: signing_key(kid) for kid in ("k1", "k2", "k9")}
+    state = {"hits": 0, "down": False, "keys": {"k1": keys["k1"]}}
+    server = jwks_stub(state)
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ["SUPABASE_URL"] = base_url
+    os.environ["SUPABASE_ANON_KEY"] = "anon"
+    os.environ["JWKS_MIN_REFETCH_INTERVAL"] = str(args.interval)
+    os.environ["JWKS_CACHE_TTL"] = str(args.interval * 2)  # background refresh after 80% of this
+    os.environ["WEBHOOK_WORKER_THREAD"] = "false"
+
+    from app import create_app
+    from app.utils import security
+
+    app = create_app()
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = ""):
+        print(f">>> {'ok  ' if ok else 'FAIL'}  {name}{f'  ({detail})' if detail else ''}")
+        if not ok:
+            failures.append(name)
+
+    def verifies(kid: str, exp_in: float = 3600) -> bool:
+        with app.app_context():
+            try:
+                security.verify_supabase_jwt(token(base_url, keys[kid][0], kid, exp_in))
+                return True
+            except jwt.PyJWTError:
+                return False
+
+    with app.app_context():
+        jwks, verified = security._jwt_caches()
+
+        check("first token fetches the key set once", verifies("k1") and state["hits"] == 1, f"hits={state['hits']}")
+
+        # Unknown kid right after a fetch: rejected without another request, even when hammered
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(verifies("k9"))) for _ in range(20)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        check("unknown kid within the interval is not refetched", len(results) == 20 and not any(results) and state["hits"] == 1, f"hits={state['hits']}")
+
+        # Key rotation: once the interval has passed, an unknown kid triggers exactly one refetch
+        state["keys"]["k2"] = keys["k2"]
+        time.sleep(args.interval + 0.1)
+        check("unknown kid after the interval refetches and verifies", verifies("k2") and state["hits"] == 2, f"hits={state['hits']}")
+        check("a second unknown kid is rate-limited again", not verifies("k9") and state["hits"] == 2, f"hits={state['hits']}")
+
+        # Auth server down: refreshes fail, the last good keys keep verifying new tokens
+        state["down"] = True
+        time.sleep(args.interval * 2 + 0.1)
+        ok = verifies("k1")
+        time.sleep(0.3)  # let the background refresh it started finish
+        check("known kid verifies from the last good keys while JWKS is down", ok and verifies("k2") and jwks.fetch_errors >= 1,
+              f"fetch_errors={jwks.fetch_errors}")
+        before = state["hits"]
+        check("unknown kid while JWKS is down fails cleanly", not verifies("k9") and state["hits"] <= before + 1, f"hits={state['hits'] - before}")
+        check("keys are still cached after failed fetches", jwks.stats()["keys"] == 2, f"keys={jwks.stats()['keys']}")
+        state["down"] = False
+
+        # Verified-token cache: served until exp, never after
+        short = token(base_url, keys["k1"][0], "k1", exp_in=2)
+        security.verify_supabase_jwt(short)
+        check("verified token is cached", verified.get(short) is not None)
+        time.sleep(max(0, jwt.decode(short, options={"verify_signature": False})["exp"] - time.time()) + 0.1)
+        check("cached token is gone at exp", verified.get(short) is None)
+        try:
+            security.verify_supabase_jwt(short)
+            expired = False
+        except jwt.ExpiredSignatureError:
+            expired = True
+        check("expired token is rejected", expired)
+
+    print(">>> FAILED" if failures else ">>> all JWKS checks passed")
+    sys.exit(1 if failures else 0)
@@ -0,0 +1,14 @@
+import os, signal, sys, threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app
+from app.services.products_svc import run_listing_refresher
+
+if __name__ == "__main__":
+    app = create_app()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    print(f">>> Refreshing product_cards every {app.config['LISTING_REFRESH_INTERVAL']:g}s when dirty (Ctrl+C to stop)")
+    run_listing_refresher(app, stop)
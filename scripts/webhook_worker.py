@@ -0,0 +1,16 @@
+import os, signal, sys, threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+# This process is the worker; don't also start the in-process drain thread
+os.environ["WEBHOOK_WORKER_THREAD"] = "false"
+
+from app import create_app
+from app.services.webhook_svc import run_webhook_worker
+
+if __name__ == "__main__":
+    app = create_app()
+    stop = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: stop.set())
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    print(">>> Draining webhook queue (Ctrl+C to stop)")
+    run_webhook_worker(app, stop)
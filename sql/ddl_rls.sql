@@ -1,6 +1,7 @@
 -- EXTENSIONS
 create extension if not exists "uuid-ossp";
 create extension if not exists "pgcrypto";
+create extension if not exists "pg_trgm";
 
 -- PRODUCTS
 create table if not exists public.products (
@@ -22,6 +23,24 @@ create index if not exists idx_products_category on public.products(category);
 create index if not exists idx_products_rating on public.products(rating);
 create index if not exists idx_products_sold on public.products(sold_count);
 
+-- Keyset pagination: one index per listing sort, with id as tie-breaker
+create index if not exists idx_products_sold_keyset on public.products(sold_count desc, id);
+create index if not exists idx_products_rating_keyset on public.products(rating desc, id);
+create index if not exists idx_products_price_asc_keyset on public.products(price, id);
+create index if not exists idx_products_price_desc_keyset on public.products(price desc, id);
+create index if not exists idx_products_created_keyset on public.products(created_at desc, id);
+
+-- Search: weighted tsvector over name/brand/category + trigram index on name
+alter table public.products add column if not exists search_tsv tsvector
+  generated always as (
+    setweight(to_tsvector('simple', coalesce(name, '')), 'A') ||
+    setweight(to_tsvector('simple', coalesce(brand, '')), 'B') ||
+    setweight(to_tsvector('simple', coalesce(category, '')), 'C')
+  ) stored;
+
+create index if not exists idx_products_search_tsv on public.products using gin(search_tsv);
+create index if not exists idx_products_name_trgm on public.products using gin(name gin_trgm_ops);
+
 alter table public.products enable row level security;
 
 -- Allow read to everyone
@@ -90,6 +109,9 @@ create table if not exists public.orders (
 
 create index if not exists idx_orders_user on public.orders(user_id);
 create index if not exists idx_orders_status on public.orders(status);
+-- Keyset pagination of a user's orders: (created_at, order_id) desc, order_id breaks ties
+drop index if exists public.idx_orders_user_created;
+create index if not exists idx_orders_user_created_id on public.orders(user_id, created_at desc, order_id desc);
 
 alter table public.orders enable row level security;
 
@@ -181,6 +203,8 @@ create table if not exists public.order_items (
 
 create index if not exists idx_order_items_order on public.order_items(order_id);
 create index if not exists idx_order_items_product on public.order_items(product_id);
+-- One line per product per order; lets bulk inserts be replayed safely
+create unique index if not exists uq_order_items_order_product on public.order_items(order_id, product_id);
 
 alter table public.order_items enable row level security;
 
@@ -205,3 +229,271 @@ with check (
     select order_id from public.orders where user_id = auth.uid()
   )
 );
+
+-- CHECKOUT
+-- Builds the order, its items and clears the (selected) cart in one transaction.
+-- Runs as the caller (security invoker) so every statement is still checked by RLS.
+create or replace function public.checkout_cart(
+  p_address_id uuid default null,
+  p_product_ids varchar(50)[] default null
+)
+returns jsonb
+language plpgsql
+security invoker
+set search_path = public
+as $$
+declare
+  v_uid uuid := auth.uid();
+  v_total numeric(12,2);
+  v_order public.orders;
+  v_items jsonb;
+begin
+  if v_uid is null then
+    raise exception 'Login required' using errcode = '28000';
+  end if;
+
+  if p_address_id is not null and not exists (
+    select 1 from public.addresses where id = p_address_id and user_id = v_uid
+  ) then
+    raise exception 'Invalid shipping address' using errcode = '22023';
+  end if;
+
+  -- Lock the cart rows: a concurrent double-click waits here and then finds an empty cart
+  perform 1 from public.cart c
+  where c.user_id = v_uid
+    and (p_product_ids is null or c.product_id = any(p_product_ids))
+  for update;
+
+  select sum(p.price * c.quantity) into v_total
+  from public.cart c
+  join public.products p on p.id = c.product_id
+  where c.user_id = v_uid
+    and (p_product_ids is null or c.product_id = any(p_product_ids));
+
+  if v_total is null then
+    return null;
+  end if;
+
+  insert into public.orders (user_id, total_price, status, address_id)
+  values (v_uid, v_total, 'pending', p_address_id)
+  returning * into v_order;
+
+  insert into public.order_items (order_id, product_id, quantity, price)
+  select v_order.order_id, c.product_id, c.quantity, p.price
+  from public.cart c
+  join public.products p on p.id = c.product_id
+  where c.user_id = v_uid
+    and (p_product_ids is null or c.product_id = any(p_product_ids));
+
+  delete from public.cart c
+  where c.user_id = v_uid
+    and (p_product_ids is null or c.product_id = any(p_product_ids));
+
+  select coalesce(jsonb_agg(to_jsonb(oi) order by oi.id), '[]'::jsonb) into v_items
+  from public.order_items oi
+  where oi.order_id = v_order.order_id;
+
+  return to_jsonb(v_order) || jsonb_build_object('items', v_items);
+end;
+$$;
+
+revoke execute on function public.checkout_cart(uuid, varchar[]) from public, anon;
+grant execute on function public.checkout_cart(uuid, varchar[]) to authenticated;
+
+-- PRODUCT SEARCH
+-- All words must match; the last one is a prefix so typeahead ("nik" -> nike) works.
+create or replace function public.products_tsquery(q text)
+returns tsquery
+language sql
+immutable
+as $$
+  select case when plain::text = '' then null
+              else to_tsquery('simple', plain::text || ':*') end
+  from plainto_tsquery('simple', q) as plain
+$$;
+
+-- Ranked matches: full-text first, then trigram similarity for typos / substrings.
+-- Callers can add PostgREST filters, ordering and ranges on top of the result.
+create or replace function public.search_products(q text)
+returns setof public.products
+language sql
+stable
+set search_path = public
+as $$
+  select p.*
+  from public.products p
+  cross join lateral (select public.products_tsquery(q) as tsq) s
+  where p.search_tsv @@ s.tsq
+     or p.name % q
+     or p.name ilike '%' || q || '%'
+  order by ts_rank(p.search_tsv, s.tsq) desc, similarity(p.name, q) desc, p.id
+$$;
+
+grant execute on function public.products_tsquery(text) to anon, authenticated;
+grant execute on function public.search_products(text) to anon, authenticated;
+
+-- PRODUCT FACETS
+-- Counts for brand, category, price and rating in one scan. Each facet ignores
+-- its own filter, so the UI can still show the other options ("Nike (42)").
+create or replace function public.product_facets(
+  p_q text default null,
+  p_brand text default null,
+  p_category text default null,
+  p_min_price numeric default null,
+  p_max_price numeric default null,
+  p_min_rating real default null,
+  p_price_bounds numeric[] default '{100000,250000,500000,1000000}',
+  p_rating_steps real[] default '{4,3,2,1}'
+)
+returns jsonb
+language sql
+stable
+set search_path = public
+as $$
+  with base as (
+    select p.brand, p.category, p.price, p.rating,
+           (p_brand is null or p.brand = p_brand) as ok_brand,
+           (p_category is null or p.category = p_category) as ok_category,
+           ((p_min_price is null or p.price >= p_min_price)
+             and (p_max_price is null or p.price <= p_max_price)) as ok_price,
+           (p_min_rating is null or p.rating >= p_min_rating) as ok_rating,
+           width_bucket(p.price, p_price_bounds) as price_bucket
+    from public.products p
+    where p_q is null or p.id in (select s.id from public.search_products(p_q) s)
+  )
+  select jsonb_build_object(
+    'brands', (
+      select coalesce(jsonb_agg(jsonb_build_object('value', brand, 'count', n) order by n desc, brand), '[]'::jsonb)
+      from (select brand, count(*) as n from base
+            where ok_category and ok_price and ok_rating group by brand) b
+    ),
+    'categories', (
+      select coalesce(jsonb_agg(jsonb_build_object('value', category, 'count', n) order by n desc, category), '[]'::jsonb)
+      from (select category, count(*) as n from base
+            where ok_brand and ok_price and ok_rating group by category) c
+    ),
+    'price', (
+      select coalesce(jsonb_agg(jsonb_build_object(
+               'min', case when price_bucket = 0 then 0 else p_price_bounds[price_bucket] end,
+               'max', case when price_bucket >= cardinality(p_price_bounds) then null else p_price_bounds[price_bucket + 1] end,
+               'count', n) order by price_bucket), '[]'::jsonb)
+      from (select price_bucket, count(*) as n from base
+            where ok_brand and ok_category and ok_rating group by price_bucket) pr
+    ),
+    'rating', (
+      select coalesce(jsonb_agg(jsonb_build_object('min', step, 'count', n) order by step desc), '[]'::jsonb)
+      from (select step, count(*) filter (where base.rating >= step) as n
+            from unnest(p_rating_steps) as step
+            cross join base
+            where ok_brand and ok_category and ok_price
+            group by step) r
+    ),
+    'total', (select count(*) from base where ok_brand and ok_category and ok_price and ok_rating)
+  )
+$$;
+
+grant execute on function public.product_facets(text, text, text, numeric, numeric, real, numeric[], real[]) to anon, authenticated;
+
+-- LISTING SUMMARIES
+-- Narrow, pre-sorted card rows (first image only) for the bestseller / top-rated grids.
+-- Writes only mark the view dirty; refresh_product_cards() rebuilds it on one schedule
+-- (pg_cron:
+--   select cron.schedule('refresh-product-cards', '* * * * *', 'select public.refresh_product_cards()');
+-- or a single scripts/refresh_listings.py process). App workers only read product_cards_status().
+create table if not exists public.listing_state (
+  name text primary key,
+  refreshed_at timestamptz,
+  dirty_since timestamptz
+);
+
+insert into public.listing_state (name, refreshed_at)
+values ('product_cards', now())
+on conflict (name) do nothing;
+
+-- No policies: only the security definer functions below read or write it
+alter table public.listing_state enable row level security;
+
+create materialized view if not exists public.product_cards as
+select id, name, brand, category, price, discount, rating, review_count, sold_count, created_at,
+       images ->> 0 as image
+from public.products;
+
+create unique index if not exists uq_product_cards_id on public.product_cards(id);
+create index if not exists idx_product_cards_sold on public.product_cards(sold_count desc, id);
+create index if not exists idx_product_cards_rating on public.product_cards(rating desc, id);
+create index if not exists idx_product_cards_brand on public.product_cards(brand);
+create index if not exists idx_product_cards_category on public.product_cards(category);
+
+grant select on public.product_cards to anon, authenticated;
+
+create or replace function public.mark_product_cards_dirty()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  -- Only the first write after a refresh touches the row, so bursts don't contend on it
+  update public.listing_state
+  set dirty_since = now()
+  where name = 'product_cards'
+    and (dirty_since is null or dirty_since <= refreshed_at);
+  return null;
+end;
+$$;
+
+drop trigger if exists trg_products_cards_dirty on public.products;
+create trigger trg_products_cards_dirty
+after insert or update or delete on public.products
+for each statement execute function public.mark_product_cards_dirty();
+
+drop trigger if exists trg_orders_paid_cards_dirty on public.orders;
+create trigger trg_orders_paid_cards_dirty
+after update of status on public.orders
+for each row
+when (new.status = 'paid' and old.status is distinct from 'paid')
+execute function public.mark_product_cards_dirty();
+
+create or replace function public.product_cards_status()
+returns jsonb
+language sql
+stable
+security definer
+set search_path = public
+as $$
+  select jsonb_build_object(
+    'refreshed_at', s.refreshed_at,
+    'dirty_since', case when s.dirty_since > s.refreshed_at then s.dirty_since end,
+    'staleness_seconds', case when s.dirty_since > s.refreshed_at
+                              then extract(epoch from now() - s.dirty_since) else 0 end
+  )
+  from public.listing_state s
+  where s.name = 'product_cards'
+$$;
+
+create or replace function public.refresh_product_cards(p_force boolean default false)
+returns jsonb
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  v_started timestamptz := clock_timestamp();
+  v_dirty boolean;
+begin
+  select coalesce(dirty_since > refreshed_at, false) into v_dirty
+  from public.listing_state where name = 'product_cards';
+
+  -- Several workers may call this at once; only one of them refreshes
+  if (v_dirty or p_force) and pg_try_advisory_xact_lock(hashtext('public.product_cards')) then
+    refresh materialized view concurrently public.product_cards;
+    update public.listing_state set refreshed_at = v_started where name = 'product_cards';
+  end if;
+
+  return public.product_cards_status();
+end;
+$$;
+
+grant execute on function public.product_cards_status() to anon, authenticated, service_role;
+revoke execute on function public.refresh_product_cards(boolean) from public, anon, authenticated;
+grant execute on function public.refresh_product_cards(boolean) to service_role;
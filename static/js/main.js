@@ -150,11 +150,16 @@ async function initHome() {
   
   let page = 1;
   let sort = 'bestseller';
+  let sortChosen = false;  // Searches rank by relevance until the user picks a sort
   let brandFilter = null;
   let searchQuery = null;  // Track current search query
 
+  function currentSort() {
+    return searchQuery && !sortChosen ? 'relevance' : sort;
+  }
+
   async function load() {
-    const qs = new URLSearchParams({ page, sort, limit: 20 });
+    const qs = new URLSearchParams({ page, sort: currentSort(), limit: 20, view: 'card' });
     if (brandFilter) qs.set('brand', brandFilter);
     
     let apiUrl = '/api/products';
@@ -196,7 +201,7 @@ async function initHome() {
 
   document.getElementById('load-more')?.addEventListener('click', async ()=>{
     // Check if there might be more items before loading
-    const params = new URLSearchParams({ page: page + 1, sort, limit: 20 });
+    const params = new URLSearchParams({ page: page + 1, sort: currentSort(), limit: 20, view: 'card' });
     if (brandFilter) params.set('brand', brandFilter);
     
     let checkUrl = '/api/products';
@@ -224,6 +229,7 @@ async function initHome() {
 
   document.getElementById('sort-select')?.addEventListener('change', async (e)=>{
     sort = e.target.value; 
+    sortChosen = true;
     page = 1; 
     await load();
   });
@@ -340,9 +346,10 @@ async function initProducts() {
 
   async function load() {
     let apiUrl = '/api/products';
-    const params = new URLSearchParams({ page, limit: 20 }); // Add limit to parameters
+    const params = new URLSearchParams({ page, limit: 20, view: 'card' }); // Add limit to parameters
     
     if (searchQuery) {
+      params.set('sort', 'relevance');
       apiUrl = `/api/products/search?q=${encodeURIComponent(searchQuery)}&${params.toString()}`;
     } else {
       apiUrl = `/api/products?${params.toString()}`;
@@ -384,10 +391,11 @@ async function initProducts() {
   
   next.addEventListener('click', async ()=>{ 
     // Only go to next page if there might be more results
-    const params = new URLSearchParams({ page: page + 1, limit: 20 });
+    const params = new URLSearchParams({ page: page + 1, limit: 20, view: 'card' });
     let checkUrl = '/api/products';
     
     if (searchQuery) {
+      params.set('sort', 'relevance');
       checkUrl = `/api/products/search?q=${encodeURIComponent(searchQuery)}&${params.toString()}`;
     } else {
       checkUrl = `/api/products?${params.toString()}`;
@@ -1012,8 +1020,15 @@ async function initOrders() {
     // Function to load and store all orders
     async function loadAllOrders() {
       try {
-        const data = await fetchJSON('/api/orders');
-        allOrders = data.items || data.data || data || [];
+        let cursor = null;
+        allOrders = [];
+        do {
+          const qs = new URLSearchParams({ limit: 50 });
+          if (cursor) qs.set('cursor', cursor);
+          const data = await fetchJSON(`/api/orders?${qs.toString()}`);
+          allOrders = allOrders.concat(data.items || data.data || []);
+          cursor = data.next_cursor;
+        } while (cursor);
         displayOrders(allOrders); // Show all orders initially
       } catch(e) {
         console.error('Error loading orders:', e);  // Debug log